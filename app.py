@@ -3,71 +3,398 @@
 
 import os
 import random
+import time
+from hashlib import sha256
 
-from flask import Flask, request, render_template, redirect
+from flask import Flask, g, request, redirect, make_response, jsonify
 
-from session import Session
+from metrics import NULL_METRICS, Metrics
+from pagecache import PageCache
+from profiling import RouteProfiler
+from render import PageRenderer
+from session import (ERROR_KINDS, ConfigError, Session, load_config, 
+    split_token)
+from solver import Solver
+from tokens import InvalidToken
+
+
+LONG_MAX_AGE = 365 * 24 * 60 * 60
+MAX_API_ACTIONS = 100
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
 
 
 def create_app(testing=False):
     app = Flask(__name__)
-            
+    config = load_config()
+    try:
+        page_cache = PageCache(int(os.environ.get('HANGMAN_PAGE_CACHE_SIZE', 
+            1024)))
+    except ValueError:
+        raise ConfigError('HANGMAN_PAGE_CACHE_SIZE must be an integer.')
+    app.extensions['page_cache'] = page_cache
+    # When set, guesses are answered with the new page directly instead of 
+    # a redirect to it.
+    direct_guess = os.environ.get('HANGMAN_DIRECT_GUESS') == '1'
+    # Timings and error counts are only recorded when metrics are enabled; 
+    # otherwise every timer is a shared no-op.
+    metrics = (Metrics() if os.environ.get('HANGMAN_METRICS') == '1' else 
+        NULL_METRICS)
+    app.extensions['metrics'] = metrics
+    # Hints are on unless HANGMAN_HINTS=0. The solver indexes the words 
+    # here, before server.py forks its workers, so they share the index 
+    # and no request waits for it.
+    solver = None
+    if os.environ.get('HANGMAN_HINTS') != '0':
+        solver = Solver(config.word_table)
+        app.extensions['solver'] = solver
+    # When HANGMAN_PROFILE_RATE is set, that fraction of session requests 
+    # (and any request with the profiling header) is profiled.
+    profiler = None
+    if os.environ.get('HANGMAN_PROFILE_RATE') is not None:
+        try:
+            profiler = RouteProfiler(config.key, 
+                float(os.environ['HANGMAN_PROFILE_RATE']))
+        except ValueError:
+            raise ConfigError('HANGMAN_PROFILE_RATE must be a number between '
+                '0 and 1.')
+        app.extensions['profiler'] = profiler
+
+    static_hashes = {}
+
+    def static_hash(filename):
+        if filename not in static_hashes:
+            with open(os.path.join(app.static_folder, filename), 'rb') as file:
+                static_hashes[filename] = sha256(file.read()).hexdigest()[:12]
+        return static_hashes[filename]
+
+    # A page depends only on its URL, the key used to decode it, the key 
+    # used to encode its links, the word table, the template and the 
+    # hashed static URLs it links to, so the ETag of a URL can be computed 
+    # without decoding it. Each key version has its own salt, and pages 
+    # under the current key keep theirs when older keys are added to the 
+    # key ring.
+    with open(os.path.join(app.root_path, 'templates', 'base.html'), 
+            'rb') as template:
+        page_salt = (config.key.encode() + template.read() + 
+            str(direct_guess).encode() + config.word_table.digest() + 
+            ''.join([static_hash(filename) for filename in sorted(os.listdir(
+            app.static_folder)) if os.path.isfile(os.path.join(
+            app.static_folder, filename))]).encode())
+    etag_salts = {config.key_version: sha256(page_salt).digest()}
+    for key_version, old_config in config.key_ring.items():
+        etag_salts[key_version] = sha256(page_salt + b':' + 
+            old_config.key.encode()).digest()
+
+    def page_etag(encoded_url):
+        # Refuses URLs under unknown or expired keys before any cached 
+        # page or 304 can be served for them.
+        key_version = config.for_version(split_token(encoded_url)[0]
+            ).key_version
+        return sha256(etag_salts[key_version] + 
+            encoded_url.encode()).hexdigest()[:32]
+
+    def session_redirect(encoded_url):
+        # 303 makes the browser follow up with a plain GET of the session 
+        # page, which caches (and the browser) can then answer themselves.
+        return redirect(f"/session/{encoded_url}", 303)
+
+    def cacheable(response, etag):
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = LONG_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    def count_game_errors(messages):
+        for message in messages:
+            metrics.count_error(ERROR_KINDS.get(message, 'other'))
+
+    def render_page(session):
+        count_game_errors(session.errors)
+        with metrics.phase('logic'):
+            session.update_word_display()
+            session.check_game_end()
+        with metrics.phase('render'):
+            return renderer.render(direct_guess=direct_guess, 
+                **session.get_context())
+
+    def cached_page(encoded_url):
+        page = page_cache.get(encoded_url)
+        if page is None:
+            with metrics.phase('decode'):
+                session = Session(encoded_url, config)
+            with metrics.phase('encode'):
+                session.encode_url()
+            page = render_page(session)
+            page_cache.put(encoded_url, page)
+        return page
+
+    def direct_response(page, encoded_url):
+        # The page is shown at the guess URL; Content-Location names the 
+        # session URL it represents, and the page script moves the address 
+        # bar there.
+        response = make_response(page)
+        response.headers['Content-Location'] = f"/session/{encoded_url}"
+        return response
+
+    @app.url_defaults
+    def hash_static_urls(endpoint, values):
+        """Add a content hash to static URLs, so they can be cached 
+        forever and still change whenever the file does.
+        """
+        if endpoint != 'static' or 'filename' not in values:
+            return
+        values['v'] = static_hash(values['filename'])
+
+    @app.after_request
+    def set_cache_headers(response):
+        """Stop caches from storing actions and random new sessions, and 
+        let them keep content hashed static files. Only a hash that matches 
+        the file being served makes it cacheable forever.
+        """
+        if request.method == 'POST' or request.endpoint == 'home':
+            response.cache_control.no_store = True
+        elif (request.endpoint == 'static' and response.status_code in (200, 
+                304) and request.args.get('v') == static_hash(
+                request.view_args['filename'])):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = LONG_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+    @app.errorhandler(InvalidToken)
+    def invalid_token(error):
+        """Reject session URLs that cannot be decoded.
+        """
+        metrics.count_error('invalid_token')
+        if request.path.startswith('/api/') or request.endpoint == 'hint':
+            return jsonify(error='Invalid session URL.'), 400
+        return 'Invalid session URL.', 400
+
     @app.route('/', methods=['GET'])
     def home():
         """Start a new session
         """
-        session = Session()
-        session.get_new_word()
-        session.encode_url()
+        with metrics.phase('logic'):
+            session = Session(config=config)
+            session.get_new_word()
+        with metrics.phase('encode'):
+            session.encode_url()
 
-        return redirect(f"/session/{session.get_encoded_url()}")
+        return session_redirect(session.get_encoded_url())
 
     @app.route('/session/<game_info>/games', methods=['POST'])
     def new_word(game_info):
         """Start a new game (using the specified session).
         """
-        session = Session(game_info)
-        session.get_new_word()
-        session.encode_url()
+        with metrics.phase('decode'):
+            session = Session(game_info, config)
+        with metrics.phase('logic'):
+            session.get_new_word()
+        with metrics.phase('encode'):
+            session.encode_url()
 
-        return redirect(f"/session/{session.get_encoded_url()}")
+        if session.has_errors():
+            return render_page(session)
+        else:
+            return session_redirect(session.get_encoded_url())
 
     @app.route('/session/<game_info>/guesses', methods=['POST'])
     def guess(game_info):
         """Enter a guess (letter or word) for the game in the specified 
-        session.
+        session. In direct guess mode the new page is returned in the same 
+        response instead of a redirect to it.
         """
-        session = Session(game_info)
-        session.add_guess(request.form['guess'])
-        session.encode_url()
+        with metrics.phase('transition'):
+            encoded_url = Session.url_with_guess(game_info, 
+                request.form['guess'], config)
+        if encoded_url and direct_guess:
+            return direct_response(cached_page(encoded_url), encoded_url)
+        elif encoded_url:
+            return session_redirect(encoded_url)
+
+        with metrics.phase('decode'):
+            session = Session(game_info, config)
+        with metrics.phase('logic'):
+            session.add_guess(request.form['guess'])
+        with metrics.phase('encode'):
+            session.encode_url()
 
         if session.has_errors():
-            session.update_word_display()
-            session.check_game_end()
-            return render_template('base.html', **session.get_context())
+            return render_page(session)
+        elif direct_guess:
+            page = render_page(session)
+            page_cache.put(session.get_encoded_url(), page)
+            return direct_response(page, session.get_encoded_url())
         else:
-            return redirect(f"/session/{session.get_encoded_url()}")
+            return session_redirect(session.get_encoded_url())
 
     @app.route('/session/<game_info>/undo', methods=['POST'])
     def undo(game_info):
         """Go back one step in the game in the specified session.
         """
-        session = Session(game_info)
-        session.undo()
-        session.encode_url()
+        with metrics.phase('transition'):
+            encoded_url = Session.url_without_last_guess(game_info, config)
+        if encoded_url:
+            return session_redirect(encoded_url)
 
-        return redirect(f"/session/{session.get_encoded_url()}")       
+        with metrics.phase('decode'):
+            session = Session(game_info, config)
+        with metrics.phase('logic'):
+            session.undo()
+        with metrics.phase('encode'):
+            session.encode_url()
+
+        return session_redirect(session.get_encoded_url())
 
     @app.route('/session/<game_info>', methods=['GET'])
     def load_game(game_info):
-        """Load the game using the data specified in the URL
+        """Load the game using the data specified in the URL. Pages are 
+        served from the page cache when possible, and repeat visitors that 
+        send a matching If-None-Match get a 304 without any decoding.
+        """
+        etag = page_etag(game_info)
+        if request.if_none_match.contains(etag):
+            return cacheable(make_response('', 304), etag)
+
+        return cacheable(make_response(cached_page(game_info)), etag)
+
+    if solver:
+        @app.route('/session/<game_info>/hint', methods=['GET'])
+        def hint(game_info):
+            """Suggest the best letter to guess next in the specified 
+            session, as JSON: {"letter": ..., "candidates": ...}, where 
+            candidates is the number of words still possible (with "word" 
+            added once only one is left). The letter is null once the game 
+            is over.
+            """
+            with metrics.phase('decode'):
+                session = Session(game_info, config)
+            with metrics.phase('logic'):
+                hint = solver.hint(session)
+            return jsonify(hint)
+
+    @app.route('/api/actions', methods=['POST'])
+    def api_actions():
+        """Apply a list of actions to a session in one call and return the 
+        resulting session URL and game state as JSON. The body is 
+        {"session": URL or null, "actions": [...]}, where each action is 
+        {"action": "guess", "guess": ...}, {"action": "undo"} or 
+        {"action": "new_game"}. Without a session a new one is started.
         """
-        session = Session(game_info)
-        session.update_word_display()
-        session.check_game_end()
-        session.encode_url()
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify(error='Expected a JSON object.'), 400
+        if not isinstance(body.get('session'), (str, type(None))):
+            return jsonify(error='session must be a session URL or null.'
+                ), 400
+        actions = body.get('actions', [])
+        if not isinstance(actions, list) or len(actions) > MAX_API_ACTIONS:
+            return jsonify(error='actions must be a list of at most '
+                f'{MAX_API_ACTIONS} actions.'), 400
+        for action in actions:
+            if not isinstance(action, dict) or action.get('action') not in (
+                    'guess', 'undo', 'new_game'):
+                return jsonify(error=f'Unknown action: {action!r}'), 400
+            if action['action'] == 'guess' and not (isinstance(
+                    action.get('guess'), str) and action['guess']):
+                return jsonify(error='guess actions need a guess.'), 400
+
+        with metrics.phase('decode'):
+            if body.get('session'):
+                session = Session(body['session'], config)
+            else:
+                session = Session(config=config)
+                session.get_new_word()
+        results = []
+        with metrics.phase('logic'):
+            for action in actions:
+                error_count = len(session.errors)
+                if action['action'] == 'guess':
+                    session.add_guess(action['guess'])
+                elif action['action'] == 'undo':
+                    session.undo()
+                else:
+                    session.get_new_word()
+                errors = session.errors[error_count:]
+                results.append({'action': action['action'], 'ok': not errors, 
+                    'errors': errors})
+            session.update_word_display()
+            session.check_game_end()
+        count_game_errors(session.errors)
+        with metrics.phase('encode'):
+            session.encode_url()
+        return jsonify(session=session.get_encoded_url(), results=results, 
+            state={'word_display': ' '.join(session.word_display), 
+                'guesses': session.guesses, 
+                'guesses_left': session.guesses_left, 
+                'victory': session.victory, 'defeat': session.defeat, 
+                'prev_word_count': len(session.previous_word_indexes)})
+
+    if metrics.enabled:
+        metrics.collect('hangman_page_cache_hits_total', 'counter', 
+            'Session pages served from the page cache.', 
+            lambda: page_cache.hits)
+        metrics.collect('hangman_page_cache_misses_total', 'counter', 
+            'Session pages rendered because they were not cached.', 
+            lambda: page_cache.misses)
+
+        @app.before_request
+        def start_request_timer():
+            g.request_start = time.perf_counter()
+
+        @app.after_request
+        def record_request_time(response):
+            metrics.observe_request(request.endpoint or 'none', 
+                time.perf_counter() - g.request_start)
+            return response
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics_page():
+            """Expose the metrics for Prometheus to scrape.
+            """
+            return metrics.expose(), 200, {
+                'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    if profiler:
+        @app.before_request
+        def start_profiling():
+            if profiler.should_profile(request.path, request.headers):
+                g.profile = profiler.start()
+
+        @app.teardown_request
+        def stop_profiling(exception):
+            if g.get('profile'):
+                profiler.stop(g.pop('profile'))
+
+        @app.route('/admin/profile', methods=['GET', 'DELETE'])
+        def profile_report():
+            """Return the aggregated profile as a text report, or as 
+            marshalled pstats data with ?format=pstats; DELETE clears it. 
+            Requires the profiling header.
+            """
+            if not profiler.authorized(request.headers):
+                return 'Forbidden.', 403
+            if request.method == 'DELETE':
+                profiler.reset()
+                return '', 204
+            if request.args.get('format') == 'pstats':
+                response = make_response(profiler.dump())
+                response.mimetype = 'application/octet-stream'
+            else:
+                sort = request.args.get('sort', 'cumulative')
+                if sort not in PROFILE_SORT_KEYS:
+                    return ('sort must be one of '
+                        f"{', '.join(PROFILE_SORT_KEYS)}.", 400)
+                limit = request.args.get('limit', 50, type=int)
+                response = make_response(profiler.report(sort, limit))
+                response.mimetype = 'text/plain'
+            response.cache_control.no_store = True
+            return response
 
-        return render_template('base.html', **session.get_context())
+    renderer = PageRenderer(app)
+    renderer.warm()
 
     return app
 
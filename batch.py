@@ -0,0 +1,40 @@
+"""Helpers for processing large streams in chunks across worker processes
+with bounded memory.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from iterable.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parallel_map(function, items, workers=None, window=None):
+    """Yield function(item) for every item, in order. With more than one
+    worker the calls run in a process pool, and at most window items (twice
+    the number of workers by default) are read ahead of the results, so
+    memory stays bounded however long items is.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(function, items)
+        return
+    window = window or 2 * workers
+    with ProcessPoolExecutor(workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,56 @@
+"""Compare encode/decode throughput of the table-driven codec against the 
+original per-character implementation.
+
+Run from the repository root with: python -m benchmarks.bench_codec
+"""
+
+import random
+import timeit
+
+from codec import CHAR_MAP, Codec
+
+
+def encode_by_hand(key, data):
+    char_map = list(CHAR_MAP)
+    encoded = []
+    for char_index in range(len(data)):
+        char_value = char_map.index(data[char_index])
+        key_value = char_map.index(key[char_index])
+        encoded.append(char_map[(char_value + key_value) % 38])
+    return ''.join(encoded)
+
+
+def decode_by_hand(key, url):
+    char_map = list(CHAR_MAP)
+    decoded = []
+    for char_index in range(len(url)):
+        char_value = char_map.index(url[char_index])
+        key_value = char_map.index(key[char_index])
+        decoded.append(char_map[(char_value - key_value) % 38])
+    return ''.join(decoded)
+
+
+def main(lengths=(10, 25, 50, 100), number=20000):
+    rng = random.Random(0)
+    key = ''.join(rng.choice(CHAR_MAP) for _ in range(max(lengths)))
+    codec = Codec(key)
+    print(f"{'length':>6} {'operation':>9} {'original':>12} {'codec':>12} "
+        f"{'speedup':>8}")
+    for length in lengths:
+        data = ''.join(rng.choice(CHAR_MAP) for _ in range(length))
+        encoded = codec.encode(data)
+        cases = [
+            ('encode', lambda: encode_by_hand(key, data), 
+                lambda: codec.encode(data)),
+            ('decode', lambda: decode_by_hand(key, encoded), 
+                lambda: codec.decode(encoded)),
+        ]
+        for operation, original, table_driven in cases:
+            original_rate = number / timeit.timeit(original, number=number)
+            codec_rate = number / timeit.timeit(table_driven, number=number)
+            print(f"{length:>6} {operation:>9} {original_rate:>10.0f}/s "
+                f"{codec_rate:>10.0f}/s {codec_rate / original_rate:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
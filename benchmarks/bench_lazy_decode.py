@@ -0,0 +1,72 @@
+"""Compare the Session work behind each route when the guesses of a legacy
+URL are decoded lazily against decoding them up front, as every route did
+before.
+
+Run from the repository root with: python -m benchmarks.bench_lazy_decode
+"""
+
+import random
+import timeit
+
+from session import Session, SessionConfig
+
+
+def new_word(session):
+    session.get_new_word()
+    session.encode_url()
+
+
+def undo(session):
+    session.undo()
+    session.encode_url()
+
+
+def guess_word(session):
+    session.add_guess('PALMYRA')
+    session.encode_url()
+
+
+def load_game(session):
+    session.encode_url()
+    session.update_word_display()
+    session.check_game_end()
+    session.get_context()
+
+
+ROUTES = (('new_word', new_word), ('undo', undo), ('guess', guess_word),
+    ('load_game', load_game))
+
+
+def main(guess_counts=(10, 100, 1000), number=2000):
+    config = SessionConfig.from_key('HANGMAN' * 1200)
+    rng = random.Random(0)
+    print(f"{'route':<10} {'guesses':>8} {'eager':>10} {'lazy':>10} "
+        f"{'speedup':>8}")
+    for guess_count in guess_counts:
+        session = Session(config=config)
+        session.previous_word_indexes = [2, 5]
+        session.current_word_index = 7
+        session.guesses = [rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in
+            range(guess_count)]
+        session.encode_url()
+        url = session.encoded_url
+
+        for name, route in ROUTES:
+            def eager():
+                session = Session(url, config)
+                session.letters_guessed
+                route(session)
+
+            def lazy():
+                route(Session(url, config))
+
+            eager_time = min(timeit.repeat(eager, number=number, repeat=3))
+            lazy_time = min(timeit.repeat(lazy, number=number, repeat=3))
+            print(f'{name:<10} {guess_count:>8} '
+                f'{eager_time / number * 1e6:>8.1f}us '
+                f'{lazy_time / number * 1e6:>8.1f}us '
+                f'{eager_time / lazy_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
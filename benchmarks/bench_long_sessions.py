@@ -0,0 +1,38 @@
+"""Time encoding and decoding legacy session URLs far longer than the key, 
+per character, with the key's offsets extended from scratch (cold) and 
+already extended (warm). The time per character should stay flat as the 
+sessions grow.
+
+Run from the repository root with: python -m benchmarks.bench_long_sessions
+"""
+
+import random
+import timeit
+
+from codec import CHAR_MAP, Codec
+
+
+def main(lengths=(100, 1000, 10000, 100000), number=20):
+    rng = random.Random(0)
+    key = ''.join(rng.choice(CHAR_MAP) for _ in range(100))
+    print(f"{'length':>8} {'cold':>12} {'warm':>12}")
+    for length in lengths:
+        data = ''.join(rng.choice(CHAR_MAP) for _ in range(length))
+
+        def cold():
+            codec = Codec(key)
+            codec.decode(codec.encode(data))
+
+        codec = Codec(key)
+
+        def warm():
+            codec.decode(codec.encode(data))
+
+        cold_time = min(timeit.repeat(cold, number=number, repeat=3))
+        warm_time = min(timeit.repeat(warm, number=number, repeat=3))
+        print(f'{length:>8} {cold_time / number / length * 1e9:>9.0f}ns/c '
+            f'{warm_time / number / length * 1e9:>9.0f}ns/c')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compare get_new_word against the original scan over the whole word 
+table, at dictionary sizes from 10^3 to 10^6.
+
+Run from the repository root with: python -m benchmarks.bench_new_word
+"""
+
+import random
+import timeit
+
+from session import Session, SessionConfig
+from wordstore import WordStore
+
+
+def synthetic_words(count):
+    """Return count distinct upper case words.
+    """
+    words = []
+    for index in range(count):
+        letters = []
+        while True:
+            letters.append(chr(65 + index % 26))
+            index //= 26
+            if not index:
+                break
+        words.append(''.join(letters) + 'ING')
+    return words
+
+
+def scan_for_new_word(word_count, previous_word_indexes):
+    """The original selection loop.
+    """
+    available_words = []
+    for word_index in range(word_count):
+        if word_index not in previous_word_indexes:
+            available_words.append(word_index)
+    return random.choice(available_words)
+
+
+def main(sizes=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6), previous_count=8):
+    key = 'HANGMAN' * 20
+    print(f"{'words':>8} {'original':>12} {'get_new_word':>14} {'speedup':>8}")
+    for size in sizes:
+        config = SessionConfig.from_key(key, WordStore.from_words(
+            synthetic_words(size)))
+        previous_word_indexes = random.sample(range(size), previous_count)
+
+        def new_word():
+            session = Session(config=config)
+            session.previous_word_indexes = list(previous_word_indexes)
+            session.current_word_index = 0
+            session.get_new_word()
+
+        number = max(3, 10 ** 7 // (size * previous_count))
+        original_rate = number / timeit.timeit(lambda: scan_for_new_word(size, 
+            previous_word_indexes), number=number)
+        new_rate = 20000 / timeit.timeit(new_word, number=20000)
+        print(f"{size:>8} {original_rate:>10.1f}/s {new_rate:>12.0f}/s "
+            f"{new_rate / original_rate:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Compare render throughput of render_template and the fragment renderer
+for the game page.
+
+Run from the repository root with: python -m benchmarks.bench_render
+"""
+
+import timeit
+
+from flask import render_template
+
+from app import create_app
+from render import PageRenderer
+
+
+CONTEXTS = {
+    'in progress': {'url': '2PCMD0,23T3WTHJV5OYP1', 'errors': '', 
+        'word_display': '_ A _ _ _ R A', 'guesses': 'A R E', 
+        'guesses_left': 7, 'victory': False, 'defeat': False, 
+        'prev_word_count': 2, 'word_count': 9},
+    'victory': {'url': '2PCMD0,23T3WTHJV5OYP1', 'errors': '', 
+        'word_display': 'P A L M Y R A', 'guesses': 'A R PALMYRA', 
+        'guesses_left': 8, 'victory': True, 'defeat': False, 
+        'prev_word_count': 2, 'word_count': 9},
+    'error': {'url': '2PCMD0,23T3WTHJV5OYP1', 
+        'errors': 'You have already guessed a word in this game.', 
+        'word_display': '_ _ _ _ _ _', 'guesses': 'GOLDEN', 
+        'guesses_left': 7, 'victory': False, 'defeat': False, 
+        'prev_word_count': 0, 'word_count': 9},
+}
+
+
+def main(number=20000):
+    app = create_app()
+    renderer = PageRenderer(app)
+    renderer.warm()
+    print(f"{'page':>12} {'render_template':>16} {'PageRenderer':>14} "
+        f"{'speedup':>8}")
+    with app.test_request_context():
+        for name, context in CONTEXTS.items():
+            assert renderer.render(**context) == render_template('base.html', 
+                **context)
+            template_rate = number / timeit.timeit(lambda: render_template(
+                'base.html', **context), number=number)
+            renderer_rate = number / timeit.timeit(lambda: renderer.render(
+                **context), number=number)
+            print(f"{name:>12} {template_rate:>14.0f}/s "
+                f"{renderer_rate:>12.0f}/s "
+                f"{renderer_rate / template_rate:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Measure the memory held by live Session objects and the memory allocated
+while handling a request, using tracemalloc.
+
+Run from the repository root with: python -m benchmarks.bench_session_memory
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+
+from session import Session, SessionConfig
+
+
+def sample_urls(config, count):
+    """Return count encoded URLs of sessions part way through a game.
+    """
+    rng = random.Random(0)
+    urls = []
+    for _ in range(count):
+        session = Session(config=config)
+        session.previous_word_indexes = rng.sample(range(9), 3)
+        session.current_word_index = rng.randrange(9)
+        session.guesses = rng.sample('ETAOINSHRDLU', 5)
+        session.encode_url()
+        urls.append(session.encoded_url)
+    return urls
+
+
+def handle_guess(url, config):
+    """The work of a guess request that misses the incremental path.
+    """
+    session = Session(url, config)
+    session.add_guess('PALMYRA')
+    session.encode_url()
+    session.update_word_display()
+    session.check_game_end()
+    return session.get_context()
+
+
+def main(count=10000):
+    config = SessionConfig.from_key('HANGMAN' * 20)
+    urls = sample_urls(config, count)
+    gc.collect()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = [Session(url, config) for url in urls]
+    after = tracemalloc.take_snapshot()
+    live = sum(stat.size_diff for stat in after.compare_to(before,
+        'filename'))
+    print(f'Live sessions:    {live / count:8.0f} bytes each '
+        f'(object itself {sys.getsizeof(sessions[0])} bytes)')
+    del sessions
+
+    peaks = []
+    for url in urls[:1000]:
+        gc.collect()
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        handle_guess(url, config)
+        peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    tracemalloc.stop()
+    print(f'Guess request:    {sum(peaks) / len(peaks):8.0f} bytes peak '
+        'allocated')
+
+
+if __name__ == '__main__':
+    main()
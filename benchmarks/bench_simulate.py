@@ -0,0 +1,63 @@
+"""Measure simulation throughput in games per second: a Session per game,
+the batch engine in one process, and the batch engine across a process
+pool.
+
+Run from the repository root with: python -m benchmarks.bench_simulate
+"""
+
+import io
+import os
+import random
+import time
+
+from session import WORD_TABLE, Session, SessionConfig
+from simulate import simulate_chunk, simulate_stream
+
+
+def game_lines(count, seed=0):
+    """Return count random game lines of 5 to 14 guesses.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        guesses = rng.sample('ABCDEFGHIJKLMNOPQRSTUVWXYZ', rng.randrange(5, 
+            14))
+        if rng.random() < 0.2:
+            guesses.append(rng.choice(WORD_TABLE))
+        lines.append(f"{rng.choice(WORD_TABLE)} {','.join(guesses)}\n")
+    return lines
+
+
+def with_sessions(lines, config):
+    for line in lines:
+        word, _, guesses = line.strip().partition(' ')
+        session = Session(config=config)
+        session.current_word = word
+        for guess in guesses.split(','):
+            session.add_guess(guess)
+        session.check_game_end()
+
+
+def rate(function, games):
+    start = time.perf_counter()
+    function()
+    return games / (time.perf_counter() - start)
+
+
+def main(count=400000):
+    lines = game_lines(count)
+    config = SessionConfig.from_key('HANGMAN' * 20)
+    workers = os.cpu_count() or 1
+    results = [
+        ('Session per game', rate(lambda: with_sessions(lines[:40000], 
+            config), 40000)),
+        ('Batch, 1 process', rate(lambda: simulate_chunk(lines), count)),
+        (f'Batch, {workers} workers', rate(lambda: simulate_stream(lines, 
+            io.BytesIO(), workers), count)),
+    ]
+    for name, games_per_second in results:
+        print(f'{name + ":":<20} {games_per_second:>10.0f} games/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Measure the solver on a large synthetic dictionary: building the
+indexes, filtering candidates, choosing a guess and rating words.
+
+Run from the repository root with: python -m benchmarks.bench_solver
+"""
+
+import random
+import time
+import timeit
+
+from solver import Solver
+
+
+# Letters repeated roughly in proportion to their frequency in English.
+LETTER_POOL = ('E' * 12 + 'T' * 9 + 'A' * 8 + 'O' * 7 + 'I' * 7 + 'N' * 7 +
+    'S' * 6 + 'H' * 6 + 'R' * 6 + 'D' * 4 + 'L' * 4 + 'CUM' * 3 + 
+    'WFGYPB' * 2 + 'VKJXQZ')
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(LETTER_POOL) for _ in 
+            range(rng.randrange(4, 13))))
+    return sorted(words)
+
+
+def main(count=300000, scored=200):
+    words = random_words(count)
+    start = time.perf_counter()
+    solver = Solver(words)
+    print(f'Index {count} words:  {time.perf_counter() - start:8.2f}s')
+
+    states = [('_' * 7, frozenset()), ('_E__E__', frozenset('TA')),
+        ('_E__E_S', frozenset('TAO'))]
+    for display, wrong in states:
+        filter_time = min(timeit.repeat(lambda: solver._candidates(display,
+            wrong), number=100, repeat=3)) / 100
+        guess_time = min(timeit.repeat(lambda: solver._best_guess(display,
+            wrong), number=3, repeat=3)) / 3
+        print(f'{display} ({solver.count(display, wrong):>6} candidates): '
+            f'filter {filter_time * 1e6:8.1f}us, '
+            f'best guess {guess_time * 1e3:6.1f}ms')
+
+    sample = random.Random(1).sample(words, scored)
+    start = time.perf_counter()
+    for word in sample:
+        solver.score(word)
+    elapsed = time.perf_counter() - start
+    print(f'Rate words:          {scored / elapsed:8.1f} words/s per process')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Compare a full decode and re-encode per action against the incremental
+URL transitions for sessions with hundreds of guesses.
+
+Run from the repository root with: python -m benchmarks.bench_transitions
+"""
+
+import random
+import timeit
+
+from codec import CHAR_MAP
+from session import Session, SessionConfig
+
+
+def main(guess_counts=(10, 100, 300, 1000), number=2000):
+    rng = random.Random(0)
+    key = ''.join(rng.choice(CHAR_MAP) for _ in range(2 * max(guess_counts) 
+        + 10))
+    config = SessionConfig.from_key(key)
+    print(f"{'guesses':>7} {'action':>6} {'full':>12} {'incremental':>12} "
+        f"{'speedup':>8}")
+    for guess_count in guess_counts:
+        session = Session(config=config)
+        session.previous_word_indexes = [2, 5]
+        session.current_word_index = 7
+        session.guesses = [rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in 
+            range(guess_count)]
+        session.encode_url()
+        url = session.encoded_url
+
+        def full_guess():
+            session = Session(url, config)
+            session.add_guess('E')
+            session.encode_url()
+
+        def full_undo():
+            session = Session(url, config)
+            session.undo()
+            session.encode_url()
+
+        cases = [
+            ('guess', full_guess, 
+                lambda: Session.url_with_guess(url, 'E', config)),
+            ('undo', full_undo, 
+                lambda: Session.url_without_last_guess(url, config)),
+        ]
+        for action, full, incremental in cases:
+            full_rate = number / timeit.timeit(full, number=number)
+            incremental_rate = number / timeit.timeit(incremental, 
+                number=number)
+            print(f"{guess_count:>7} {action:>6} {full_rate:>10.0f}/s "
+                f"{incremental_rate:>10.0f}/s "
+                f"{incremental_rate / full_rate:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Compare request latency of the WSGI development server and the ASGI 
+entry point under many concurrent simulated players.
+
+Each server runs in its own subprocess. An asyncio load generator then
+starts every player at once; a player opens a session and plays a number
+of turns, each a guess POST followed by the GET of the redirect, and the
+latency of every request is recorded. The ASGI side needs uvicorn
+installed.
+
+Run from the repository root with: python -m benchmarks.compare_servers
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+
+SERVERS = {
+    'wsgi': [sys.executable, '-c', 'import sys; from werkzeug.serving import '
+        'run_simple; from app import create_app; run_simple("127.0.0.1", '
+        'int(sys.argv[1]), create_app(), threaded=True)'],
+    'asgi': [sys.executable, '-m', 'uvicorn', '--factory', 
+        'asgi:create_asgi_app', '--log-level', 'warning', '--backlog', '4096', 
+        '--host', '127.0.0.1', '--port'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, port):
+    env = dict(os.environ, HANGMAN_TOKEN_FORMAT='compact')
+    process = subprocess.Popen(SERVERS[name] + [str(port)], env=env, 
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{name} server did not start')
+
+
+async def request(port, method, path, body=b''):
+    """Send one request on a new connection, returning (status, location, 
+    latency in seconds).
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = (f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        'Connection: close\r\n')
+    if body:
+        head += ('Content-Type: application/x-www-form-urlencoded\r\n'
+            f'Content-Length: {len(body)}\r\n')
+    writer.write(head.encode() + b'\r\n' + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    latency = time.perf_counter() - started
+    lines = response.split(b'\r\n\r\n', 1)[0].split(b'\r\n')
+    status = int(lines[0].split()[1])
+    location = None
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        if name.lower() == b'location':
+            location = value.strip().decode()
+    return status, location, latency
+
+
+async def player(port, turns, latencies, failures):
+    rng = random.Random()
+    try:
+        status, location, latency = await request(port, 'GET', '/')
+        latencies.append(latency)
+        for _ in range(turns):
+            guess = rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+            status, redirect, latency = await request(port, 'POST', 
+                f'{location}/guesses', f'guess={guess}'.encode())
+            latencies.append(latency)
+            if status != 303:
+                failures.append(status)
+                return
+            location = redirect
+            status, _, latency = await request(port, 'GET', location)
+            latencies.append(latency)
+            if status != 200:
+                failures.append(status)
+                return
+    except OSError as error:
+        failures.append(type(error).__name__)
+
+
+async def load(port, players, turns):
+    latencies = []
+    failures = []
+    started = time.perf_counter()
+    await asyncio.gather(*[player(port, turns, latencies, failures) for _ in 
+        range(players)])
+    return latencies, failures, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--turns', type=int, default=5)
+    parser.add_argument('--servers', nargs='+', default=['wsgi', 'asgi'], 
+        choices=sorted(SERVERS))
+    args = parser.parse_args()
+    print(f"{'server':>6} {'requests':>9} {'failed':>7} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.servers:
+        port = free_port()
+        process = start_server(name, port)
+        try:
+            latencies, failures, elapsed = asyncio.run(load(port, 
+                args.players, args.turns))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"{name:>6} {len(latencies):>9} {len(failures):>7} "
+            f"{len(latencies) / elapsed:>8.0f} "
+            f"{1000 * percentile(latencies, 0.5):>8.1f} "
+            f"{1000 * percentile(latencies, 0.99):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compare turns and requests per second of the redirect and direct guess
+modes over real HTTP.
+
+Each mode gets its own threaded local server. Client threads play turns
+by posting a letter guess to a fresh session URL; in redirect mode the
+303 is followed with a GET, as a browser would.
+
+Run from the repository root with: python -m benchmarks.loadtest_guess
+"""
+
+import argparse
+import http.client
+import logging
+import os
+import random
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from session import Session
+
+
+def start_server(direct):
+    """Start a threaded server for one mode, returning (server, port).
+    """
+    previous = os.environ.get('HANGMAN_DIRECT_GUESS')
+    os.environ['HANGMAN_DIRECT_GUESS'] = '1' if direct else '0'
+    try:
+        app = create_app()
+    finally:
+        if previous is None:
+            del os.environ['HANGMAN_DIRECT_GUESS']
+        else:
+            os.environ['HANGMAN_DIRECT_GUESS'] = previous
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def session_urls(count, seed=0):
+    rng = random.Random(seed)
+    urls = []
+    for _ in range(count):
+        session = Session()
+        session.get_new_word()
+        session.guesses = rng.sample('ETAOINSHRDLU', 3)
+        session.encode_url()
+        urls.append(session.get_encoded_url())
+    return urls
+
+
+def play(port, urls, duration, counts, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    rng = random.Random()
+    turns = requests = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        url = rng.choice(urls)
+        connection.request('POST', f'/session/{url}/guesses', 
+            body=f'guess={rng.choice("BCFGKMPVWXYZ")}', 
+            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = connection.getresponse()
+        response.read()
+        requests += 1
+        if response.status == 303:
+            connection.request('GET', response.getheader('Location'))
+            response = connection.getresponse()
+            response.read()
+            requests += 1
+        if response.status != 200:
+            raise RuntimeError(f'Unexpected status {response.status}')
+        turns += 1
+    connection.close()
+    with lock:
+        counts[0] += turns
+        counts[1] += requests
+
+
+def run(direct, clients, duration, urls):
+    server, port = start_server(direct)
+    counts = [0, 0]
+    lock = threading.Lock()
+    threads = [threading.Thread(target=play, args=(port, urls, duration, 
+        counts, lock)) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    return counts[0] / duration, counts[1] / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    urls = session_urls(200)
+    print(f"{'mode':>8} {'turns/s':>10} {'requests/s':>11}")
+    for mode, direct in [('redirect', False), ('direct', True)]:
+        turns, requests = run(direct, args.clients, args.duration, urls)
+        print(f"{mode:>8} {turns:>10.0f} {requests:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Benchmark suite for the codec, game logic and routes, with a stored
+baseline to catch slowdowns.
+
+Every benchmark reports operations per second (the best of several runs).
+Results are written as JSON and compared with benchmarks/baseline.json; any
+benchmark slower than the baseline by more than the tolerance is reported
+and the suite exits with status 1.
+
+Run from the repository root:
+
+    python -m benchmarks.suite                    # run and compare
+    python -m benchmarks.suite --update-baseline  # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results.json')
+
+# A fixed key and seed keep the encoded URLs, and so the work measured,
+# the same on every run.
+SUITE_KEY = ''.join(random.Random(0).choice(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-,') for _ in range(4000))
+
+
+def measure(function, repeat=5):
+    """Return the best operations per second over several timed runs, each
+    long enough to take at least 0.2 seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+
+def codec_benchmarks(config):
+    from session import Session
+
+    rng = random.Random(0)
+    results = {}
+    for guess_count in (0, 10, 100, 1000):
+        session = Session(config=config)
+        session.previous_word_indexes = [2, 5]
+        session.current_word_index = 7
+        session.guesses = [rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in
+            range(guess_count)]
+        session.encode_url()
+        url = session.encoded_url
+        results[f'encode_url[{guess_count} guesses]'] = measure(
+            session.encode_url)
+        # Reading the guesses forces the decode that a legacy URL leaves 
+        # until they are needed; decode_header measures the URL alone.
+        results[f'decode_url[{guess_count} guesses]'] = measure(
+            lambda: Session(url, config).guesses)
+        results[f'decode_header[{guess_count} guesses]'] = measure(
+            lambda: Session(url, config))
+    return results
+
+
+def logic_benchmarks(config):
+    from benchmarks.bench_new_word import synthetic_words
+    from session import Session, SessionConfig
+    from wordstore import WordStore
+
+    results = {}
+    for size in (10 ** 3, 10 ** 4, 10 ** 5):
+        sized_config = SessionConfig.from_key(SUITE_KEY,
+            WordStore.from_words(synthetic_words(size)))
+        previous_word_indexes = random.Random(0).sample(range(size), 8)
+
+        def new_word():
+            session = Session(config=sized_config)
+            session.previous_word_indexes = list(previous_word_indexes)
+            session.current_word_index = 0
+            session.get_new_word()
+
+        results[f'get_new_word[{size} words]'] = measure(new_word)
+
+    session = Session(config=config)
+    session.current_word_index = 3
+    session.current_word = 'VECCHIO'
+    for guess in ['E', 'T', 'A', 'O', 'I', 'N', 'S', 'PALMYRA']:
+        session.add_guess(guess)
+    results['check_game_end'] = measure(session.check_game_end)
+    results['update_word_display'] = measure(session.update_word_display)
+    return results
+
+
+def route_benchmarks(config):
+    from app import create_app
+    from session import Session
+
+    client = create_app().test_client()
+    session = Session(config=config)
+    session.previous_word_indexes = [2, 5]
+    session.current_word_index = 7
+    session.guesses = ['E', 'T', 'A', 'O', 'BRIDGE', 'I']
+    session.encode_url()
+    url = session.encoded_url
+    return {
+        'GET /': measure(lambda: client.get('/')),
+        'GET /session': measure(lambda: client.get(f'/session/{url}')),
+        'POST /session/guesses[letter]': measure(lambda: client.post(
+            f'/session/{url}/guesses', data={'guess': 'R'})),
+        'POST /session/guesses[word]': measure(lambda: client.post(
+            f'/session/{url}/guesses', data={'guess': 'NARROWS'})),
+        'POST /session/undo': measure(lambda: client.post(
+            f'/session/{url}/undo')),
+        'POST /session/games': measure(lambda: client.post(
+            f'/session/{url}/games')),
+        'POST /api/actions': measure(lambda: client.post('/api/actions',
+            json={'session': url, 'actions': [{'action': 'guess',
+            'guess': 'R'}, {'action': 'undo'}]})),
+    }
+
+
+def run():
+    # Measure the work behind each route rather than the page cache.
+    os.environ['HANGMAN_KEY'] = SUITE_KEY
+    os.environ['HANGMAN_PAGE_CACHE_SIZE'] = '0'
+    for name in ('HANGMAN_WORDS', 'HANGMAN_TOKEN_FORMAT',
+            'HANGMAN_DIRECT_GUESS'):
+        os.environ.pop(name, None)
+    from session import load_config
+
+    config = load_config()
+    results = {}
+    results.update(codec_benchmarks(config))
+    results.update(logic_benchmarks(config))
+    results.update(route_benchmarks(config))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the names of benchmarks slower than the baseline by more than
+    the tolerance, printing a line per benchmark.
+    """
+    regressions = []
+    print(f"{'benchmark':<36} {'ops/s':>12} {'baseline':>12} {'change':>8}")
+    for name, rate in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f'{name:<36} {rate:>12.0f} {"-":>12} {"new":>8}')
+            continue
+        change = rate / base - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<36} {rate:>12.0f} {base:>12.0f} {change:>+8.0%}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite.')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+        help='allowed slowdown before failing, as a fraction (default 0.5)')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run()
+    document = {'python': platform.python_version(),
+        'machine': platform.machine(), 'results': results}
+    with open(args.output, 'w') as output:
+        json.dump(document, output, indent=2, sort_keys=True)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(document, baseline_file, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --update-baseline')
+        return 1
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f'\n{len(regressions)} benchmark(s) regressed by more than '
+            f'{args.tolerance:.0%}: {", ".join(regressions)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Character codec used to encode and decode session URLs.
+
+Each character of the data string is shifted through the character map by
+the value of the key character at the same position. Past the end of the
+key the offsets come from a SHA-256 keystream derived from the key, so
+data strings of any length can be encoded and strings that fit the key
+are encoded as they always were. The shift tables are built once per
+process and the key is reduced to a tuple of offsets, extended as longer
+strings are seen, so encoding and decoding are a single pass of
+dictionary lookups.
+"""
+
+import threading
+from functools import lru_cache
+from hashlib import sha256
+
+
+CHAR_MAP = ('A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M',
+    'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z', '0', '1',
+    '2', '3', '4', '5', '6', '7', '8', '9', '-', ',')
+CHAR_INDEX = {char: index for index, char in enumerate(CHAR_MAP)}
+
+# ENCODE_TABLES[offset][char] is char shifted forward by offset, and
+# DECODE_TABLES[offset] reverses it.
+ENCODE_TABLES = tuple({char: CHAR_MAP[(index + offset) % len(CHAR_MAP)]
+    for char, index in CHAR_INDEX.items()} for offset in range(len(CHAR_MAP)))
+DECODE_TABLES = tuple({char: CHAR_MAP[(index - offset) % len(CHAR_MAP)]
+    for char, index in CHAR_INDEX.items()} for offset in range(len(CHAR_MAP)))
+# Keystream bytes at or above this are skipped, so that the offsets taken
+# from the others (byte % 38) are uniform.
+_OFFSET_LIMIT = 256 - 256 % len(CHAR_MAP)
+
+
+class Codec:
+    """Encodes and decodes data strings against a single key.
+    """
+    def __init__(self, key):
+        self.key = key
+        self.offsets = tuple(CHAR_INDEX[char] for char in key)
+        self._encode_tables = tuple(ENCODE_TABLES[offset] for offset in
+            self.offsets)
+        self._decode_tables = tuple(DECODE_TABLES[offset] for offset in
+            self.offsets)
+        self._keystream = Keystream(key, 'legacy')
+        # Keystream bytes already turned into offsets.
+        self._keystream_used = 0
+        self._lock = threading.Lock()
+
+    def _extend(self, length):
+        """Extend the offsets and tables to cover at least length 
+        positions, at least doubling them so that growing to a length 
+        costs linear time overall.
+        """
+        with self._lock:
+            if length <= len(self.offsets):
+                return
+            target = max(length, 2 * len(self.offsets))
+            offsets = list(self.offsets)
+            used = self._keystream_used
+            while len(offsets) < target:
+                # A few more bytes than needed, as some are skipped.
+                needed = target - len(offsets)
+                for byte in self._keystream.take(used + needed + needed // 8 
+                        + 32)[used:]:
+                    used += 1
+                    if byte < _OFFSET_LIMIT:
+                        offsets.append(byte % len(CHAR_MAP))
+                        if len(offsets) == target:
+                            break
+            added = offsets[len(self.offsets):]
+            self._encode_tables += tuple(ENCODE_TABLES[offset] for offset in
+                added)
+            self._decode_tables += tuple(DECODE_TABLES[offset] for offset in
+                added)
+            self._keystream_used = used
+            self.offsets = tuple(offsets)
+
+    def encode(self, data, start=0):
+        """Encode a data string. Produces the same output as shifting each
+        character by hand, for as far as the key goes. Pass start to 
+        encode a piece of a longer string that begins at that position.
+        """
+        if start + len(data) > len(self._encode_tables):
+            self._extend(start + len(data))
+        return self._translate(data, self._encode_tables, start)
+
+    def decode(self, encoded, start=0):
+        """Decode a string produced by encode.
+        """
+        if start + len(encoded) > len(self._decode_tables):
+            self._extend(start + len(encoded))
+        return self._translate(encoded, self._decode_tables, start)
+
+    def find(self, encoded, char, start=0, offset=0):
+        """Return the lowest index in encoded, at or after start, of a 
+        character that decodes to char, or -1 if there is none, without 
+        decoding the rest. encoded begins at position offset of the data.
+        """
+        if offset + len(encoded) > len(self._encode_tables):
+            self._extend(offset + len(encoded))
+        tables = self._encode_tables
+        for index in range(start, len(encoded)):
+            if encoded[index] == tables[offset + index][char]:
+                return index
+        return -1
+
+    def rfind(self, encoded, char, offset=0):
+        """Return the highest index in encoded of a character that decodes 
+        to char, or -1 if there is none, searching from the end.
+        """
+        if offset + len(encoded) > len(self._encode_tables):
+            self._extend(offset + len(encoded))
+        tables = self._encode_tables
+        for index in range(len(encoded) - 1, -1, -1):
+            if encoded[index] == tables[offset + index][char]:
+                return index
+        return -1
+
+    def _translate(self, text, tables, start):
+        if start:
+            tables = tables[start:start + len(text)]
+        try:
+            return ''.join([table[char] for table, char in zip(tables, text)])
+        except KeyError as error:
+            raise ValueError(f'{error.args[0]!r} is not in the character map')
+
+
+@lru_cache(maxsize=8)
+def get_codec(key):
+    """Return the shared Codec for a key, building it on first use.
+    """
+    return Codec(key)
+
+
+class Keystream:
+    """A pseudo-random byte stream derived from a key with SHA-256 in 
+    counter mode. Generated bytes are kept, so repeated calls only hash 
+    the part of the stream that has not been needed before.
+    """
+    def __init__(self, key, label):
+        self._seed = label.encode() + b':' + key.encode()
+        self._buffer = b''
+
+    def take(self, length):
+        """Return the first length bytes of the stream.
+        """
+        buffer = self._buffer
+        if length > len(buffer):
+            target = max(length, 2 * len(buffer))
+            target += -target % 32
+            buffer += keystream_bytes(self._seed, target - len(buffer), 
+                first_block=len(buffer) // 32)
+            self._buffer = buffer
+        return buffer[:length]
+
+
+def keystream_bytes(seed, length, first_block=0):
+    """Return length bytes of SHA-256 counter-mode output for a seed, 
+    starting at the given block.
+    """
+    blocks = []
+    for counter in range(first_block, first_block + -(-length // 32)):
+        blocks.append(sha256(seed + counter.to_bytes(4, 'big')).digest())
+    return b''.join(blocks)[:length]
+
+
+def xor_bytes(data, stream):
+    """XOR data with an equally long byte stream.
+    """
+    length = len(data)
+    mixed = int.from_bytes(data, 'big') ^ int.from_bytes(stream, 'big')
+    return mixed.to_bytes(length, 'big')
@@ -0,0 +1,50 @@
+"""Bitmask helpers for evaluating guesses against a word.
+
+Every character of the character map is given one bit, so the set of
+letters in a word, or the set of letters guessed, is a single int and
+comparing them is a bitwise operation.
+"""
+
+from functools import lru_cache
+
+from codec import CHAR_MAP
+
+
+LETTER_BITS = {char: 1 << index for index, char in enumerate(CHAR_MAP)}
+
+
+@lru_cache(maxsize=65536)
+def word_letters(word):
+    """Return (mask, positions) for a word, where mask has the bit of every
+    letter in the word set and positions maps each letter to the tuple of
+    indexes where it appears. Computed once per word and then cached.
+    """
+    positions = {}
+    for index, char in enumerate(word):
+        positions.setdefault(char, []).append(index)
+    mask = 0
+    for char in positions:
+        mask |= LETTER_BITS.get(char, 0)
+    return mask, {char: tuple(indexes) for char, indexes in positions.items()}
+
+
+def guess_mask(guesses):
+    """Return the mask of the single letter guesses in a list of guesses.
+    """
+    mask = 0
+    for guess in guesses:
+        if len(guess) == 1:
+            mask |= LETTER_BITS.get(guess, 0)
+    return mask
+
+
+def masked_display(word, mask):
+    """Return the letters of word with every letter outside mask replaced 
+    by _
+    """
+    display = ['_'] * len(word)
+    for char, indexes in word_letters(word)[1].items():
+        if LETTER_BITS.get(char, 0) & mask:
+            for index in indexes:
+                display[index] = char
+    return display
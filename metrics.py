@@ -0,0 +1,192 @@
+"""Request timing and error counters, exposed in the Prometheus text format.
+
+Each phase of handling a request (decoding the URL, the game logic,
+encoding the URL and rendering the page) is timed into a histogram, along
+with the whole request per endpoint, and errors are counted by kind.
+Metrics are kept per process; when they are disabled the application uses
+NULL_METRICS, whose timers do nothing.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, one series per label
+    value.
+    """
+    def __init__(self, name, documentation, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [
+                    [0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self, label_value):
+        """Return (cumulative bucket counts, sum, count) for a label value.
+        """
+        with self._lock:
+            counts, total = self._series.get(label_value,
+                [[0] * (len(self.buckets) + 1), 0.0])
+            counts = list(counts)
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram']
+        with self._lock:
+            label_values = sorted(self._series)
+        for label_value in label_values:
+            cumulative, total, count = self.samples(label_value)
+            label = (self.label, label_value)
+            for bound, running in zip(self.buckets + ('+Inf',), cumulative):
+                le = bound if isinstance(bound, str) else _format_value(bound)
+                lines.append(f'{self.name}_bucket'
+                    f'{_format_labels([label, ("le", le)])} {running}')
+            lines.append(f'{self.name}_sum{_format_labels([label])} '
+                f'{_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels([label])} {count}')
+        return lines
+
+
+class Counter:
+    """A monotonically increasing count, one series per label value.
+    """
+    def __init__(self, name, documentation, label):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + \
+                amount
+
+    def value(self, label_value):
+        return self._values.get(label_value, 0)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_value, count in values:
+            lines.append(f'{self.name}'
+                f'{_format_labels([(self.label, label_value)])} {count}')
+        return lines
+
+
+class _PhaseTimer:
+    __slots__ = ('histogram', 'phase', 'start')
+
+    def __init__(self, histogram, phase):
+        self.histogram = histogram
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(self.phase, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """The application's metrics.
+    """
+    enabled = True
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.phases = Histogram('hangman_phase_seconds',
+            'Time spent in each phase of handling a request.', 'phase',
+            buckets)
+        self.requests = Histogram('hangman_request_seconds',
+            'Time spent handling a request, by endpoint.', 'endpoint',
+            buckets)
+        self.errors = Counter('hangman_errors_total',
+            'Errors returned to players, by kind.', 'kind')
+        self._collected = {}
+
+    def phase(self, name):
+        """Return a context manager that times a phase of the request.
+        """
+        return _PhaseTimer(self.phases, name)
+
+    def observe_request(self, endpoint, seconds):
+        self.requests.observe(endpoint, seconds)
+
+    def count_error(self, kind):
+        self.errors.inc(kind)
+
+    def collect(self, name, metric_type, documentation, read):
+        """Expose a value kept elsewhere (such as the page cache counters),
+        read when the metrics are scraped.
+        """
+        self._collected[name] = (metric_type, documentation, read)
+
+    def expose(self):
+        """Return every metric in the Prometheus text exposition format.
+        """
+        lines = self.phases.expose() + self.requests.expose() + \
+            self.errors.expose()
+        for name, (metric_type, documentation, read) in sorted(
+                self._collected.items()):
+            lines += [f'# HELP {name} {documentation}',
+                f'# TYPE {name} {metric_type}', f'{name} {read()}']
+        return '\n'.join(lines) + '\n'
+
+
+class NullMetrics:
+    """Stands in for Metrics when metrics are disabled; records nothing.
+    """
+    enabled = False
+    _timer = nullcontext()
+
+    def phase(self, name):
+        return self._timer
+
+    def observe_request(self, endpoint, seconds):
+        pass
+
+    def count_error(self, kind):
+        pass
+
+
+NULL_METRICS = NullMetrics()
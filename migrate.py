@@ -0,0 +1,161 @@
+"""Bulk migration of session URLs to a new key or token format.
+
+Reads session tokens, decodes each one with the current settings and
+encodes it again with the new ones, writing one line per token with the
+old and new tokens separated by a tab (the new token is empty when the
+old one cannot be migrated). Input is read and written a chunk at a time
+and the chunks are processed across a pool of worker processes, so memory
+use does not grow with the number of tokens.
+
+The old key comes from HANGMAN_KEY and the new key from HANGMAN_NEW_KEY
+(the old key is kept if it is not set); HANGMAN_WORDS applies to both.
+Tokens under the keys in HANGMAN_KEY_RING are decoded as well, and new
+tokens carry HANGMAN_NEW_KEY_VERSION (HANGMAN_KEY_VERSION if it is not
+set), so the tool can also bring every token onto the newest key.
+Tokens are read one per line, or with --extract from every /session/...
+path in the lines of a log:
+
+    HANGMAN_NEW_KEY=... python migrate.py urls.txt > mapping.tsv
+    python migrate.py --format sealed --extract access.jsonl > mapping.tsv
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from batch import chunked, parallel_map
+from session import (TOKEN_FORMATS, WORD_TABLE, ConfigError, Session,
+    SessionConfig, parse_key_ring)
+from tokens import InvalidToken
+from wordstore import WordStore
+
+
+# A token, with its key version if it has one.
+SESSION_PATH = re.compile(
+    r'/session/((?:[a-z0-9]{1,8}\.)?[A-Za-z0-9_,-]+)')
+
+_worker_configs = {}
+
+
+def migrate_token(token, old_config, new_config):
+    """Return the token re-encoded with new_config, raising InvalidToken
+    if old_config cannot decode it.
+    """
+    old = Session(token, old_config)
+    new = Session(config=new_config)
+    new.previous_word_indexes = old.previous_word_indexes
+    new.current_word_index = old.current_word_index
+    new.current_word = old.current_word
+    new.guesses = old.guesses
+    new.encode_url()
+    return new.encoded_url
+
+
+def read_tokens(lines, extract=False):
+    """Yield the tokens in lines: each stripped line, or with extract every
+    token that follows /session/ in a line.
+    """
+    for line in lines:
+        if extract:
+            yield from SESSION_PATH.findall(line)
+        else:
+            token = line.strip()
+            if token:
+                yield token
+
+
+def _configs(settings):
+    # Each worker process builds the configurations once.
+    if settings not in _worker_configs:
+        (old_key, key_version, key_ring, new_key, new_key_version, 
+            token_format, words_path) = settings
+        word_table = WORD_TABLE
+        if words_path:
+            try:
+                word_table = WordStore.open(words_path)
+            except (OSError, ValueError) as error:
+                raise ConfigError(f'Could not open HANGMAN_WORDS: {error}')
+        _worker_configs[settings] = (
+            SessionConfig.from_key(old_key, word_table, 
+                key_version=key_version, 
+                key_ring=parse_key_ring(key_ring)),
+            SessionConfig.from_key(new_key, word_table, token_format, 
+                key_version=new_key_version))
+    return _worker_configs[settings]
+
+
+def migrate_chunk(job):
+    """Migrate a chunk of tokens, returning the output lines and the
+    number of tokens that could not be migrated.
+    """
+    settings, tokens = job
+    old_config, new_config = _configs(settings)
+    lines = []
+    invalid = 0
+    for token in tokens:
+        try:
+            new_token = migrate_token(token, old_config, new_config)
+        except InvalidToken:
+            new_token = ''
+            invalid += 1
+        lines.append(f'{token}\t{new_token}\n')
+    return ''.join(lines), invalid
+
+
+def main(argv=None, environ=os.environ):
+    parser = argparse.ArgumentParser(description='Re-encode session tokens '
+        'with a new key or token format.')
+    parser.add_argument('input', nargs='?', default='-',
+        help="file to read tokens from, or '-' for stdin (the default)")
+    parser.add_argument('--format', choices=TOKEN_FORMATS,
+        default=environ.get('HANGMAN_TOKEN_FORMAT', 'legacy'),
+        help='token format to encode with (default: HANGMAN_TOKEN_FORMAT '
+        'or legacy)')
+    parser.add_argument('--extract', action='store_true',
+        help='take the tokens from /session/ paths in each line')
+    parser.add_argument('--workers', type=int, default=None,
+        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if not environ.get('HANGMAN_KEY'):
+        print('HANGMAN_KEY must be set to the key the tokens were encoded '
+            'with.', file=sys.stderr)
+        return 2
+    key_version = environ.get('HANGMAN_KEY_VERSION', '')
+    settings = (environ['HANGMAN_KEY'], key_version,
+        environ.get('HANGMAN_KEY_RING', ''),
+        environ.get('HANGMAN_NEW_KEY') or environ['HANGMAN_KEY'],
+        environ.get('HANGMAN_NEW_KEY_VERSION', key_version),
+        args.format, environ.get('HANGMAN_WORDS'))
+    try:
+        # Check the settings once here rather than in every worker.
+        _configs(settings)
+    except ConfigError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    input_file = sys.stdin if args.input == '-' else open(args.input)
+    start = time.perf_counter()
+    migrated = invalid = 0
+    try:
+        jobs = ((settings, chunk) for chunk in chunked(read_tokens(
+            input_file, args.extract), args.chunk_size))
+        for lines, chunk_invalid in parallel_map(migrate_chunk, jobs,
+                args.workers):
+            sys.stdout.write(lines)
+            migrated += lines.count('\n') - chunk_invalid
+            invalid += chunk_invalid
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+    elapsed = time.perf_counter() - start
+    print(f'{migrated} tokens migrated, {invalid} invalid, in '
+        f'{elapsed:.2f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""An in-process LRU cache of rendered session pages.
+
+A session page is a pure function of its URL, so the rendered HTML can be
+reused for every request with the same URL. The cache is bounded by entry
+count and evicts the least recently used page first.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class PageCache:
+    """Thread-safe LRU mapping from encoded URL to a rendered page.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, encoded_url):
+        """Return the cached page for a URL, or None.
+        """
+        with self._lock:
+            page = self._pages.get(encoded_url)
+            if page is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._pages.move_to_end(encoded_url)
+            return page
+
+    def put(self, encoded_url, page):
+        """Store a page, evicting the least recently used one if full.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._pages[encoded_url] = page
+            self._pages.move_to_end(encoded_url)
+            if len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+
+    def __len__(self):
+        return len(self._pages)
+
+    def stats(self):
+        """Return the hit and miss counters and the current size.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 
+            'size': len(self._pages), 'maxsize': self.maxsize}
@@ -0,0 +1,110 @@
+"""Opt-in profiling of live session requests.
+
+A RouteProfiler runs cProfile over a random sample of the requests to
+/session/ routes, and over any request that carries a valid profiling
+header, adding each profile to a running total kept in memory. The total
+can be read back as a pstats report or as marshalled pstats data, which
+pstats.Stats and tools such as snakeviz load directly.
+
+The header value is derived from the key with profile_token, so only
+whoever holds HANGMAN_KEY can trigger profiling or read the results.
+"""
+
+import cProfile
+import hmac
+import io
+import marshal
+import pstats
+import random
+import threading
+from hashlib import sha256
+
+
+PROFILE_HEADER = 'X-Hangman-Profile'
+
+
+def profile_token(key):
+    """Return the value of the profiling header for a key.
+    """
+    return hmac.new(key.encode(), b'hangman-profile', sha256).hexdigest()
+
+
+class RouteProfiler:
+    """Profiles sampled requests and aggregates the results.
+    """
+    def __init__(self, key, sample_rate=0.0, rng=random):
+        if not 0 <= sample_rate <= 1:
+            raise ValueError('The sample rate must be between 0 and 1.')
+        self.sample_rate = sample_rate
+        self.rng = rng
+        self.requests = 0
+        self._token = profile_token(key).encode()
+        self._stats = None
+        self._lock = threading.Lock()
+        # Only one profiler can be active at a time, so concurrent requests
+        # are not profiled while another one is.
+        self._active = threading.Lock()
+
+    def authorized(self, headers):
+        """Check whether the request headers carry the profiling token.
+        Header values are compared as bytes (WSGI decodes them as 
+        latin-1), since compare_digest refuses non-ASCII strings.
+        """
+        value = headers.get(PROFILE_HEADER, '').encode('latin-1', 'replace')
+        return hmac.compare_digest(value, self._token)
+
+    def should_profile(self, path, headers):
+        if not path.startswith('/session/'):
+            return False
+        return (self.rng.random() < self.sample_rate or
+            self.authorized(headers))
+
+    def start(self):
+        """Start profiling the current request, returning the profiler, or
+        None if another request is being profiled.
+        """
+        if not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active in this process.
+            self._active.release()
+            return None
+        return profiler
+
+    def stop(self, profiler):
+        """Stop a profiler from start and add its results to the total.
+        """
+        profiler.disable()
+        self._active.release()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler)
+            else:
+                self._stats.add(profiler)
+            self.requests += 1
+
+    def report(self, sort='cumulative', limit=50):
+        """Return the aggregated profile as a pstats text report.
+        """
+        output = io.StringIO()
+        with self._lock:
+            output.write(f'{self.requests} profiled requests\n')
+            if self._stats is not None:
+                self._stats.stream = output
+                self._stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def dump(self):
+        """Return the aggregated profile as marshalled pstats data, in the
+        format written by pstats.Stats.dump_stats.
+        """
+        with self._lock:
+            return marshal.dumps(self._stats.stats if self._stats else {})
+
+    def reset(self):
+        with self._lock:
+            self._stats = None
+            self.requests = 0
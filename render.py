@@ -0,0 +1,70 @@
+"""Fast rendering of the game page.
+
+base.html only has a handful of branches (errors shown or not, victory,
+defeat, the New Game button, direct guess mode), so the page can only take
+a few shapes. For each shape the template is rendered once with marker
+strings in place of the variables, and the output is split into the
+literal fragments between them. Rendering a page is then a join of those
+fragments with the escaped values, giving exactly the HTML the template
+would produce without going through Jinja on each request.
+"""
+
+import itertools
+import re
+import threading
+
+from markupsafe import escape
+
+
+_MARKER = '\x00{}\x00'
+_MARKER_PATTERN = re.compile('\x00(\\w+)\x00')
+_VARIABLES = ('url', 'errors', 'word_display', 'guesses', 'guesses_left')
+
+
+class PageRenderer:
+    """Renders base.html for a Flask application from cached fragments.
+    """
+    def __init__(self, app, template_name='base.html'):
+        self.app = app
+        self.template = app.jinja_env.get_template(template_name)
+        self._fragments = {}
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Build the fragments of every page shape ahead of time.
+        """
+        for shape in itertools.product((False, True), repeat=5):
+            self._build(shape)
+
+    def render(self, url, errors, word_display, guesses, guesses_left,
+            victory, defeat, prev_word_count, word_count, direct_guess=False):
+        """Return the page for the given template context.
+        """
+        shape = (bool(errors), bool(victory), bool(defeat),
+            prev_word_count < word_count - 1, bool(direct_guess))
+        fragments = self._fragments.get(shape)
+        if fragments is None:
+            fragments = self._build(shape)
+        values = {'url': url, 'errors': errors, 'word_display': word_display,
+            'guesses': guesses, 'guesses_left': guesses_left}
+        parts = [fragments[0]]
+        for name, literal in fragments[1]:
+            parts.append(escape(values[name]))
+            parts.append(literal)
+        return ''.join(parts)
+
+    def _build(self, shape):
+        errors, victory, defeat, more_words, direct_guess = shape
+        context = {name: _MARKER.format(name) for name in _VARIABLES}
+        if not errors:
+            context['errors'] = ''
+        context.update(victory=victory, defeat=defeat,
+            prev_word_count=0 if more_words else 1, word_count=2,
+            direct_guess=direct_guess)
+        with self.app.test_request_context():
+            output = self.template.render(**context)
+        pieces = _MARKER_PATTERN.split(output)
+        fragments = (pieces[0], tuple(zip(pieces[1::2], pieces[2::2])))
+        with self._lock:
+            self._fragments[shape] = fragments
+        return fragments
@@ -0,0 +1,190 @@
+"""Pre-forking server for running the application in production.
+
+The master process builds the application once (loading the key, the
+session configuration, the word store and the hint solver's index), opens
+the listening socket and then forks the workers, which inherit all of it copy-on-write and accept
+connections from the shared socket. Signals to the master:
+  * SIGHUP reloads: the environment file (if any) is read again, a new
+    application is built and a new set of workers is started before the
+    old workers are told to finish their current request and exit
+  * SIGTERM or SIGINT stops the workers gracefully and exits
+Each worker serves one connection at a time, so connections that send
+nothing are closed after --timeout seconds rather than holding a worker.
+
+    python server.py --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from session import ConfigError
+
+
+log = logging.getLogger('hangman.server')
+
+DEFAULT_TIMEOUT = 10
+
+
+def read_env_file(path):
+    """Load KEY=VALUE lines from a file into the environment.
+    """
+    with open(path) as env_file:
+        for line in env_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                name, _, value = line.partition('=')
+                os.environ[name.strip()] = value.strip()
+
+
+def run_worker(app, listener, timeout=DEFAULT_TIMEOUT):
+    """Serve requests from the shared socket until told to stop. A
+    connection that is idle for timeout seconds is closed.
+    """
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    # StreamRequestHandler applies the timeout to every accepted socket.
+    handler = type('TimeoutRequestHandler', (WSGIRequestHandler,),
+        {'timeout': timeout})
+    server = make_server(*listener.getsockname()[:2], app,
+        request_handler=handler, fd=listener.fileno())
+    # Every worker waits on the same socket; a non-blocking accept lets the
+    # ones that lose the race go back to waiting.
+    server.socket.setblocking(False)
+    server.timeout = 0.5
+    while not stopping:
+        server.handle_request()
+    server.server_close()
+
+
+class Master:
+    """Owns the listening socket and keeps the configured number of
+    workers running.
+    """
+    def __init__(self, host, port, workers, env_file=None,
+            timeout=DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.env_file = env_file
+        self.timeout = timeout
+        self.listener = socket.create_server((host, port), backlog=2048)
+        self.listener.setblocking(False)
+        self.generation = 0
+        self.children = {}
+        self.app = None
+        self._signals = []
+
+    def load(self):
+        """Build a new application, returning False if the configuration
+        is unusable.
+        """
+        try:
+            if self.env_file:
+                read_env_file(self.env_file)
+            app = create_app()
+        except (ConfigError, OSError, ValueError) as error:
+            log.error('Could not load the application: %s', error)
+            return False
+        self.app = app
+        self.generation += 1
+        return True
+
+    def spawn(self):
+        # Keep the warmed objects out of the garbage collector's reach, so
+        # collections in the workers do not copy their pages.
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.app, self.listener, self.timeout)
+            except BaseException:
+                log.exception('Worker crashed')
+                status = 1
+            finally:
+                os._exit(status)
+        self.children[pid] = self.generation
+
+    def stop_generation(self, generation=None):
+        for pid, child_generation in self.children.items():
+            if generation is None or child_generation == generation:
+                os.kill(pid, signal.SIGTERM)
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            self.children.pop(pid, None)
+
+    def run(self):
+        if not self.app and not self.load():
+            return 1
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame:
+                self._signals.append(signum))
+        host, port = self.listener.getsockname()[:2]
+        print(f'Listening on {host}:{port} with {self.workers} workers',
+            flush=True)
+        while True:
+            self.reap()
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP:
+                    old_generation = self.generation
+                    if self.load():
+                        log.info('Reloaded; replacing workers')
+                        self.stop_generation(old_generation)
+                else:
+                    return self.shutdown()
+            current = sum(1 for generation in self.children.values() if
+                generation == self.generation)
+            for _ in range(self.workers - current):
+                self.spawn()
+            time.sleep(0.2)
+
+    def shutdown(self, timeout=10):
+        self.stop_generation()
+        deadline = time.monotonic() + timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        self.listener.close()
+        return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Hangman server '
+        'with pre-forked worker processes.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--env-file', help='file of KEY=VALUE lines (such '
+        'as HANGMAN_KEY) read at startup and on every reload')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+        help='seconds before an idle connection is closed (default: '
+        f'{DEFAULT_TIMEOUT})')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO,
+        format='%(asctime)s %(process)d %(message)s')
+    return Master(args.host, args.port, args.workers, args.env_file,
+        args.timeout).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,161 +6,662 @@ URL that represents the session.
 
 import os
 import random
+import re
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from codec import CHAR_INDEX, CHAR_MAP, Codec, Keystream, get_codec
+from letters import LETTER_BITS, guess_mask, masked_display, word_letters
+from tokens import (COMPACT_PREFIX, SEALED_PREFIX, InvalidToken, 
+    TokenSealer, decode_compact, encode_compact)
+from wordstore import WordStore
+
+
+WORD_TABLE = ("FINESSE", "WHITMAN", "TACONY", "VECCHIO", "PALMYRA", "GOLDEN", 
+    "BRIDGE", "NARROWS", "BIFROST")
+TOKEN_FORMATS = ('legacy', 'compact', 'sealed')
+# A key version is written in front of a token and separated from it by a 
+# '.', which none of the token formats use.
+KEY_VERSION = re.compile(r'[a-z0-9]{1,8}')
+MAX_KEY_VERSION_LENGTH = 8
+
+
+class ConfigError(RuntimeError):
+    """Raised when the session configuration is missing or invalid.
+    """
+
+
+@dataclass(frozen=True)
+class SessionConfig:
+    """Settings shared by every Session in the process. Built once and 
+    never modified, so sessions can reference it instead of copying it.
+    """
+    key: str
+    codec: Codec
+    char_index: MappingProxyType
+    word_table: WordStore
+    token_format: str
+    compact_keystream: Keystream
+    sealer: TokenSealer
+    key_version: str = ''
+    # When an older key stops being accepted, as a Unix time (None for 
+    # never).
+    expires: float = None
+    # The configurations of the other accepted keys, by key version.
+    key_ring: MappingProxyType = field(
+        default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def from_key(cls, key, word_table=WORD_TABLE, token_format='legacy', 
+            key_version='', key_ring=()):
+        """Validate the key and precompute everything derived from it. 
+        The word table may be a WordStore or any sequence of words. 
+        key_ring lists the (key version, key, expiry time or None) of older 
+        keys whose tokens are still accepted.
+        """
+        _check_key(key, 'HANGMAN_KEY')
+        if token_format not in TOKEN_FORMATS:
+            raise ConfigError(f'HANGMAN_TOKEN_FORMAT must be one of '
+                f'{", ".join(TOKEN_FORMATS)}, not {token_format!r}.')
+        if key_version and not KEY_VERSION.fullmatch(key_version):
+            raise ConfigError('HANGMAN_KEY_VERSION must be 1 to 8 lower '
+                f'case letters or digits, not {key_version!r}.')
+        if not isinstance(word_table, WordStore):
+            word_table = WordStore.from_words(word_table)
+        ring = {}
+        for version, old_key, expires in key_ring:
+            if version == key_version or version in ring:
+                raise ConfigError(f'Key version {version!r} is used more '
+                    'than once.')
+            if version and not KEY_VERSION.fullmatch(version):
+                raise ConfigError(f'Invalid key version {version!r} in '
+                    'HANGMAN_KEY_RING.')
+            _check_key(old_key, 'HANGMAN_KEY_RING')
+            ring[version] = cls._build(old_key, word_table, token_format, 
+                version, expires)
+        return cls._build(key, word_table, token_format, key_version, 
+            key_ring=MappingProxyType(ring))
+
+    @classmethod
+    def _build(cls, key, word_table, token_format, key_version, 
+            expires=None, key_ring=MappingProxyType({})):
+        return cls(key=key, codec=get_codec(key), 
+            char_index=MappingProxyType(CHAR_INDEX), word_table=word_table, 
+            token_format=token_format, 
+            compact_keystream=Keystream(key, 'compact'), 
+            sealer=TokenSealer(key), key_version=key_version, 
+            expires=expires, key_ring=key_ring)
+
+    @property
+    def token_prefix(self):
+        """The key version prefix written in front of new tokens.
+        """
+        return f'{self.key_version}.' if self.key_version else ''
+
+    def for_version(self, key_version, now=None):
+        """Return the configuration of the key with the given version, 
+        raising InvalidToken if it is unknown or has expired.
+        """
+        if key_version == self.key_version:
+            return self
+        config = self.key_ring.get(key_version)
+        if config is None:
+            raise InvalidToken('Session URL has an unknown key version.')
+        if config.expires is not None and (time.time() if now is None else 
+                now) >= config.expires:
+            raise InvalidToken('Session URL key has expired.')
+        return config
+
+
+def _check_key(key, name):
+    if not key:
+        raise ConfigError(f'{name} must be a non-empty string.')
+    invalid = sorted(set(key) - set(CHAR_INDEX))
+    if invalid:
+        raise ConfigError(f'{name} contains characters outside the '
+            f"character map: {''.join(invalid)!r}")
+
+
+def split_token(token):
+    """Split a token into its key version ('' if it has none) and the 
+    token proper. Only the first few characters are searched, so this 
+    does not depend on the length of the token.
+    """
+    dot = token.find('.', 0, MAX_KEY_VERSION_LENGTH + 1)
+    if dot < 0:
+        return '', token
+    return token[:dot], token[dot + 1:]
+
+
+def parse_key_ring(value):
+    """Parse a HANGMAN_KEY_RING value: entries separated by ';', each a 
+    key version (empty for tokens without one), ':', the key and 
+    optionally ':' and the Unix time after which the key is refused.
+    """
+    key_ring = []
+    for entry in value.split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(':')
+        if len(parts) not in (2, 3):
+            raise ConfigError('HANGMAN_KEY_RING entries must be '
+                'version:key or version:key:expires.')
+        expires = None
+        if len(parts) == 3:
+            try:
+                expires = float(parts[2])
+            except ValueError:
+                raise ConfigError('HANGMAN_KEY_RING expiry times must be '
+                    f'Unix times, not {parts[2]!r}.')
+        key_ring.append((parts[0], parts[1], expires))
+    return key_ring
+
+
+_config = None
+_WORD_GUESSED_MESSAGE = 'You have already guessed a word in this game.'
+_EXHAUSTED_MESSAGE = 'You have played every word in this session.'
+_INVALID_GUESS_MESSAGE = 'Guesses may only contain the letters A-Z and ' \
+    'the digits 0-9.'
+# Short names for the error messages, used to count them.
+ERROR_KINDS = {_WORD_GUESSED_MESSAGE: 'word_already_guessed', 
+    _EXHAUSTED_MESSAGE: 'words_exhausted', 
+    _INVALID_GUESS_MESSAGE: 'invalid_guess'}
+
+
+def load_config(environ=os.environ):
+    """Build the process-wide configuration from the environment, raising 
+    ConfigError straight away if it is unusable. HANGMAN_WORDS may name a 
+    word store file to use instead of the built-in word table, 
+    HANGMAN_KEY_VERSION the version written in front of new tokens and 
+    HANGMAN_KEY_RING the older keys whose tokens are still accepted.
+    """
+    global _config
+    if 'HANGMAN_KEY' not in environ:
+        raise ConfigError('The HANGMAN_KEY environment variable is not set.')
+    word_table = WORD_TABLE
+    if environ.get('HANGMAN_WORDS'):
+        try:
+            word_table = WordStore.open(environ['HANGMAN_WORDS'])
+        except (OSError, ValueError) as error:
+            raise ConfigError(f'Could not open HANGMAN_WORDS: {error}')
+    if not len(word_table):
+        raise ConfigError('The word table is empty.')
+    _config = SessionConfig.from_key(environ['HANGMAN_KEY'], word_table, 
+        token_format=environ.get('HANGMAN_TOKEN_FORMAT', 'legacy'), 
+        key_version=environ.get('HANGMAN_KEY_VERSION', ''), 
+        key_ring=parse_key_ring(environ.get('HANGMAN_KEY_RING', '')))
+    return _config
+
+
+def get_config():
+    """Return the process-wide configuration, loading it on first use.
+    """
+    return _config or load_config()
+
+
+def pick_unplayed_index(word_count, played, rng=random):
+    """Pick a uniformly random index in range(word_count) that is not in 
+    played, or return None if every index has been played. The cost 
+    depends on the number of played words, not on word_count.
+    """
+    played = {index for index in played if 0 <= index < word_count}
+    remaining = word_count - len(played)
+    if remaining <= 0:
+        return None
+    if remaining * 2 >= word_count:
+        # At least half the indexes are free, so this takes fewer than two 
+        # attempts on average.
+        while True:
+            index = rng.randrange(word_count)
+            if index not in played:
+                return index
+    # Otherwise choose the n-th unplayed index by stepping over the played 
+    # indexes below it.
+    index = rng.randrange(remaining)
+    for played_index in sorted(played):
+        if played_index > index:
+            break
+        index += 1
+    return index
+
+
+def _check_word_indexes(previous_word_indexes, current_word_index, 
+        word_count):
+    """Raise ValueError unless every word index is in the word table.
+    """
+    if current_word_index >= word_count or any(word_index >= word_count for 
+            word_index in previous_word_indexes):
+        raise ValueError('word index out of range')
+
+
+def _decode_header(codec, url, word_count):
+    """Decode the word indexes at the start of a legacy URL, returning the 
+    previous word indexes, the current word index and the position of the 
+    '-' that ends them. Raises ValueError if they are malformed or not in 
+    a word table of word_count words.
+    """
+    first = codec.find(url, '-')
+    second = codec.find(url, '-', first + 1) if first >= 0 else -1
+    if second < 0:
+        raise ValueError('the URL has fewer than three fields')
+    data = codec.decode(url[:second]).split('-')
+    if ',' in data[0]:
+        previous_word_indexes = [int(word_index) for word_index in 
+            data[0].split(',') if word_index]
+    else:
+        previous_word_indexes = [int(digit) for digit in data[0]]
+    current_word_index = int(data[1])
+    _check_word_indexes(previous_word_indexes, current_word_index, 
+        word_count)
+    return previous_word_indexes, current_word_index, second
+
+
+def _legacy_url(url, config):
+    # Return the position of the '-' that ends the word indexes of a URL 
+    # in the legacy format under the current key, or -1 if the URL is not 
+    # one or a full decode would reject its word indexes.
+    key_version, url = split_token(url or '')
+    if (config.token_format != 'legacy' or not url or 
+            key_version != config.key_version or 
+            url[0] in (COMPACT_PREFIX, SEALED_PREFIX)):
+        return -1
+    try:
+        return _decode_header(config.codec, url, len(config.word_table))[2]
+    except ValueError:
+        return -1
+
+
+# Marks word_guessed as not yet split out of the guesses (None means no 
+# word has been guessed).
+_UNSPLIT = object()
 
 
 class Session:
     """Represents a single session being played by a user.
+
+    A Session is created for every request, so it is slotted and holds 
+    little more than the decoded URL. The guesses of a legacy URL are only 
+    decoded when first read, letters_guessed and word_guessed are split out 
+    of the guesses when first read, errors is only created when used, and 
+    word_display, guesses_left, victory and defeat are worked out when 
+    first read after a change (or when update_word_display and 
+    check_game_end are called).
     """
-    def __init__(self, encoded_url=None):
-        self.key = os.environ['HANGMAN_KEY']
-        self.char_map = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 
-            'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 
-            'Y', 'Z', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '-', ','] 
-        self.word_table = ["FINESSE", "WHITMAN", "TACONY", "VECCHIO", "PALMYRA", 
-        "GOLDEN", "BRIDGE", "NARROWS", "BIFROST"]
+    __slots__ = ('config', 'previous_word_indexes', 'current_word_index', 
+        'current_word', '_guesses', '_guesses_tail', '_guesses_start', 
+        'encoded_url', '_letters_guessed', '_word_guessed', '_errors', 
+        '_word_display', '_game_end')
+
+    char_map = CHAR_MAP
+
+    def __init__(self, encoded_url=None, config=None):
+        self.config = config or get_config()
         self.previous_word_indexes = []
         self.current_word_index = None
         self.current_word = None
-        self.word_display = []
-        self.guesses = []
-        self.letters_guessed = []
-        self.word_guessed = None
-        self.errors = []
-        self.victory = False
-        self.defeat = False
+        self._guesses = []
+        # The still encoded guesses of a legacy URL, and their position in 
+        # the data string.
+        self._guesses_tail = None
+        self._guesses_start = 0
+        self._letters_guessed = []
+        self._word_guessed = None
+        self._errors = None
+        self._word_display = None
+        self._game_end = None
         self.encoded_url = encoded_url
         if encoded_url:
             self.decode_url(encoded_url)
 
+    @property
+    def key(self):
+        return self.config.key
+
+    @property
+    def codec(self):
+        return self.config.codec
+
+    @property
+    def word_table(self):
+        return self.config.word_table
+
+    @property
+    def guesses(self):
+        if self._guesses is None:
+            self._decode_guesses()
+        return self._guesses
+
+    @guesses.setter
+    def guesses(self, guesses):
+        self._guesses = guesses
+        self._guesses_tail = None
+
+    @property
+    def letters_guessed(self):
+        if self._letters_guessed is None:
+            self._split()
+        return self._letters_guessed
+
+    @letters_guessed.setter
+    def letters_guessed(self, letters):
+        self._letters_guessed = letters
+        self._changed()
+
+    @property
+    def word_guessed(self):
+        if self._word_guessed is _UNSPLIT:
+            self._split()
+        return self._word_guessed
+
+    @word_guessed.setter
+    def word_guessed(self, word):
+        self._word_guessed = word
+        self._changed()
+
+    @property
+    def errors(self):
+        if self._errors is None:
+            self._errors = []
+        return self._errors
+
+    @property
+    def word_display(self):
+        if self._word_display is None:
+            self.update_word_display()
+        return self._word_display
+
+    @property
+    def guesses_left(self):
+        if self._game_end is None:
+            self.check_game_end()
+        return self._game_end[0]
+
+    @property
+    def victory(self):
+        if self._game_end is None:
+            self.check_game_end()
+        return self._game_end[1]
+
+    @property
+    def defeat(self):
+        if self._game_end is None:
+            self.check_game_end()
+        return self._game_end[2]
+
     def decode_url(self, url):
         """Decode and parse the URL, extracting the list of previous words, 
-        current word, and guesses.
+        current word, and guesses. Sealed, compact and legacy URLs are 
+        all accepted, under the current key or any other accepted key in 
+        the key ring; any URL that cannot be decoded raises InvalidToken.
+        Only the word indexes of a legacy URL are decoded here; its guesses 
+        are decoded when first read (or straight away under an older key, 
+        as they are encoded again with the current key).
         """
-        decoded = []
-        for char_index in range(len(url)):
-            char_to_decode = url[char_index]
-            char_value = self.char_map.index(url[char_index])
-            key_value = self.char_map.index(self.key[char_index])
-            decoded_char_value = (char_value - key_value) % 38
-            decoded.append(self.char_map[decoded_char_value])
-        data = ''.join(decoded).split('-')
-        self.previous_word_indexes = [int(digit) for digit in data[0]]
-        self.current_word_index = int(data[1])
-        self.current_word = self.word_table[self.current_word_index]
-        self.guesses = data[2].split(',') if data[2] else []
+        key_version, url = split_token(url)
+        config = self.config.for_version(key_version)
+        try:
+            if url.startswith(SEALED_PREFIX):
+                (self.previous_word_indexes, self.current_word_index, 
+                    self.guesses) = config.sealer.open(url)
+                _check_word_indexes(self.previous_word_indexes, 
+                    self.current_word_index, len(self.word_table))
+            elif url.startswith(COMPACT_PREFIX):
+                (self.previous_word_indexes, self.current_word_index, 
+                    self.guesses) = decode_compact(config.compact_keystream, 
+                    url)
+                _check_word_indexes(self.previous_word_indexes, 
+                    self.current_word_index, len(self.word_table))
+            else:
+                codec = config.codec
+                (self.previous_word_indexes, self.current_word_index, 
+                    second) = _decode_header(codec, url, 
+                    len(self.word_table))
+                self._guesses = None
+                self._guesses_tail = url[second + 1:]
+                self._guesses_start = second + 1
+                if config is not self.config:
+                    self._decode_guesses(codec)
+            self.current_word = self.word_table[self.current_word_index]
+        except InvalidToken:
+            raise
+        except (ValueError, IndexError) as error:
+            raise InvalidToken(f'Could not decode session URL: {error}')
+        self.split_guesses()
+
+    def _decode_guesses(self, codec=None):
+        try:
+            guesses = (codec or self.codec).decode(self._guesses_tail, 
+                self._guesses_start)
+        except ValueError as error:
+            raise InvalidToken(f'Could not decode session URL: {error}')
+        if '-' in guesses:
+            raise InvalidToken('Could not decode session URL: too many '
+                'fields')
+        self._guesses = guesses.split(',') if guesses else []
+        self._guesses_tail = None
+
+    def split_guesses(self):
+        """Mark letters_guessed and word_guessed to be rebuilt from the 
+        guesses when next read, along with everything derived from them.
+        """
+        self._letters_guessed = None
+        self._word_guessed = _UNSPLIT
+        self._changed()
+
+    def _split(self):
+        letters_guessed = []
+        word_guessed = None
         for guess in self.guesses:
             if len(guess) > 1:
-                self.word_guessed = guess 
+                word_guessed = guess 
             else:
-                self.letters_guessed.append(guess)    
+                letters_guessed.append(guess)
+        self._letters_guessed = letters_guessed
+        self._word_guessed = word_guessed
+
+    def _changed(self):
+        self._word_display = None
+        self._game_end = None
 
     def encode_url(self):
-        """Update the encoded URL containing all the game data.
+        """Update the encoded URL containing all the game data, using the 
+        configured token format.
         """
-        previous_word_indexes = ''.join([str(i) for i in 
-            self.previous_word_indexes])
+        prefix = self.config.token_prefix
+        if self.config.token_format == 'sealed':
+            self.encoded_url = prefix + self.config.sealer.seal(
+                self.previous_word_indexes, self.current_word_index, 
+                self.guesses)
+            return
+        if self.config.token_format == 'compact':
+            self.encoded_url = prefix + encode_compact(
+                self.config.compact_keystream, self.previous_word_indexes, 
+                self.current_word_index, self.guesses)
+            return
+        if any(i > 9 for i in self.previous_word_indexes):
+            # Multi-digit indexes are comma separated, with a trailing comma
+            # so a single index is not read back as one digit per word.
+            previous_word_indexes = ''.join([f'{i},' for i in 
+                self.previous_word_indexes])
+        else:
+            previous_word_indexes = ''.join([str(i) for i in 
+                self.previous_word_indexes])
         current_word_index = str(self.current_word_index)
+        header = f"{previous_word_indexes}-{current_word_index}-"
+        if self._guesses is None and len(header) == self._guesses_start:
+            # The guesses were never decoded and still sit at the same 
+            # position, so their encoded form can be reused as it is.
+            self.encoded_url = (prefix + self.codec.encode(header) + 
+                self._guesses_tail)
+            return
         guesses = ','.join(self.guesses)
-        data_string = (f"{previous_word_indexes}-{current_word_index}-{guesses}")
-        encoded = []
-        for char_index in range(len(data_string)):
-            char_value = self.char_map.index(data_string[char_index])
-            key_value = self.char_map.index(self.key[char_index])
-            encoded_char_value = (char_value + key_value) % 38
-            encoded.append(self.char_map[encoded_char_value])
-        self.encoded_url = ''.join(encoded)
+        data_string = (f"{header}{guesses}")
+        self.encoded_url = prefix + self.codec.encode(data_string)
+
+    @classmethod
+    def url_with_guess(cls, encoded_url, guess, config=None):
+        """Return the URL after adding a letter guess, computed by encoding
+        only the new characters at the end of the URL. Returns None when
+        the change needs a full decode (word guesses, or URLs that are not
+        in the legacy format under the current key or whose word indexes 
+        are malformed).
+        """
+        config = config or get_config()
+        guess = guess.upper()
+        if (len(guess) != 1 or not guess.isalnum() or
+                guess not in config.char_index):
+            return None
+        second = _legacy_url(encoded_url, config)
+        if second < 0:
+            return None
+        url = split_token(encoded_url)[1]
+        end = len(url)
+        try:
+            last_char = config.codec.decode(url[-1], end - 1)
+        except ValueError:
+            return None
+        if last_char == '-' and end - 1 != second:
+            # A fourth field, which a full decode rejects.
+            return None
+        tail = guess if last_char == '-' else ',' + guess
+        return encoded_url + config.codec.encode(tail, end)
+
+    @classmethod
+    def url_without_last_guess(cls, encoded_url, config=None):
+        """Return the URL after removing the last guess, computed by
+        decoding backwards from the end of the URL only as far as that
+        guess. Returns None when there is no guess to remove or the URL is
+        not in the legacy format under the current key or its word indexes 
+        are malformed.
+        """
+        config = config or get_config()
+        second = _legacy_url(encoded_url, config)
+        if second < 0:
+            return None
+        url = split_token(encoded_url)[1]
+        prefix = config.token_prefix
+        decode = config.codec.decode
+        try:
+            for position in range(len(url) - 1, second, -1):
+                char = decode(url[position], position)
+                if char == ',':
+                    return prefix + url[:position]
+                if char == '-':
+                    # A fourth field, which a full decode rejects.
+                    return None
+        except ValueError:
+            return None
+        if second == len(url) - 1:
+            return None
+        return prefix + url[:second + 1]
 
     def get_new_word(self):
         """Clear out the guesses, update the previous words list, and 
-        update game_data with a new random unplayed word
+        update game_data with a new random unplayed word. If every word 
+        has been played, an error is added and the session is unchanged.
         """
+        played = self.previous_word_indexes
+        if self.current_word_index is not None:
+            played = played + [self.current_word_index]
+        word_index = pick_unplayed_index(len(self.word_table), played)
+        if word_index is None:
+            self.errors.append(_EXHAUSTED_MESSAGE)
+            return
         self.guesses = []
-        if self.current_word_index:
-            self.previous_word_indexes.append(self.current_word_index)
-        available_words = []
-        for word_index in range(9):
-            if word_index not in self.previous_word_indexes:
-                available_words.append(word_index)
-        self.current_word_index = random.choice(available_words)
+        self.split_guesses()
+        self.previous_word_indexes = played
+        self.current_word_index = word_index
         self.current_word = self.word_table[self.current_word_index]
+        self._changed()
 
     def add_guess(self, guess):
         """Parse the guess and update letter guesses or word guesses as 
-        appropriate. 
+        appropriate. Guesses that are empty or hold anything but letters 
+        and digits (which no token format could store) add an error.
         """
         guess = guess.upper()
+        if not (guess.isascii() and guess.isalnum()):
+            self.errors.append(_INVALID_GUESS_MESSAGE)
+            return
         if len(guess) > 1 and self.word_guessed:
-            self.errors.append('You have already guessed a word in this game.')
-        elif len(guess) > 1:
-            self.guesses.append(guess)
-            self.word_guessed = guess
-        else:
-            self.guesses.append(guess)
-            self.letters_guessed.append(guess)
+            self.errors.append(_WORD_GUESSED_MESSAGE)
+            return
+        self.guesses.append(guess)
+        if len(guess) > 1:
+            self._word_guessed = guess
+        elif self._letters_guessed is not None:
+            self._letters_guessed.append(guess)
+        self._changed()
 
     def update_word_display(self):
         """Add all correctly guessed letters or a word to the display, 
         leaving unguessed letters as _
         """
         if self.word_guessed == self.current_word:
-            self.word_display = list(self.current_word)
+            self._word_display = list(self.current_word)
             return 
         
-        self.word_display = []
-        for char in self.current_word:
-            if char in self.guesses:
-                self.word_display.append(char)
-            else:
-                self.word_display.append('_')
+        self._word_display = masked_display(self.current_word, 
+            guess_mask(self.guesses))
 
     def undo(self):
         """Remove the previous guess. 
         If there was no previous guess, go to the previous word. 
         If there was no previous word, select a new word.
         """
-        if self.guesses:
+        if self._guesses is None and self._guesses_tail:
+            # Drop the last guess from the encoded guesses, without 
+            # decoding the ones before it.
+            end = self.codec.rfind(self._guesses_tail, ',', 
+                self._guesses_start)
+            self._guesses_tail = self._guesses_tail[:max(end, 0)]
+            self.split_guesses()
+        elif self.guesses:
             self.guesses.pop()
+            self.split_guesses()
         elif self.previous_word_indexes:
             self.current_word_index = self.previous_word_indexes.pop()
             self.current_word = self.word_table[self.current_word_index]
+            self._changed()
         else:
-            self.current_word_index = random.choice(range(9))
+            self.current_word_index = random.randrange(len(self.word_table))
             self.current_word = self.word_table[self.current_word_index]
+            self._changed()
 
     def check_game_end(self):
         """Check letters and word guessed to see if all letters/word 
         were correctly guessed, or if 8 incorrect guesses were made.
         """
-        self.guesses_left = 8
-        letters_to_match = set(list(self.current_word))
-        correct_letters = set()
+        guesses_left = 8
+        word_mask = word_letters(self.current_word)[0]
+        guessed_mask = 0
         for letter in self.letters_guessed:
-            if letter in letters_to_match:
-                correct_letters.add(letter)
-            else:
-                self.guesses_left -= 1
+            bit = LETTER_BITS.get(letter, 0)
+            guessed_mask |= bit
+            if not bit & word_mask:
+                guesses_left -= 1
         if self.word_guessed and (self.word_guessed != self.current_word):
-            self.guesses_left -= 1
-        if (self.word_guessed == self.current_word or len(letters_to_match) == 
-            len(correct_letters)):
-            self.victory = True
-        elif self.guesses_left <= 0:
-            self.defeat = True     
+            guesses_left -= 1
+        victory = (self.word_guessed == self.current_word or 
+            not word_mask & ~guessed_mask)
+        self._game_end = (guesses_left, victory, 
+            not victory and guesses_left <= 0)
 
     def get_context(self):
         """Return all the necessary data for rendering the game template
         """
-        return {'url': self.encoded_url, 'errors': ' '.join(self.errors), 
+        return {'url': self.encoded_url, 
+            'errors': ' '.join(self._errors) if self._errors else '', 
             'word_display': ' '.join(self.word_display), 
             'guesses': ' '.join(self.guesses), 'guesses_left': self.guesses_left, 
             'victory': self.victory, 'defeat': self.defeat, 
-            'prev_word_count': len(self.previous_word_indexes)}
+            'prev_word_count': len(self.previous_word_indexes), 
+            'word_count': len(self.word_table)}
 
     def get_encoded_url(self):
         return self.encoded_url  
 
     def has_errors(self):
-        if self.errors:
-            return True
-        else:
-            return False          
\ No newline at end of file
+        return bool(self._errors)          
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""Offline batch simulation of games.
+
+Replays (word, guesses) games with the rules of Session.add_guess and
+Session.check_game_end, without building a Session per game. Guesses are
+taken as a session URL stores them, so an empty guess counts as a wrong
+one rather than being refused as add_guess would refuse it. Every game
+is a handful of int bitmask operations, games are evaluated a chunk at a
+time into arrays, and chunks are spread across a process pool.
+
+Games are read one per line as the word, a space and the comma separated
+guesses (the same form as the guesses in a session URL), for example:
+
+    VECCHIO E,T,A,O,VECCHIO
+
+Results are written to a compact binary file: the magic bytes b'HSR1'
+followed by two signed bytes per game, the status (0 in progress,
+1 victory, 2 defeat) and the guesses left (clamped to -128). Run:
+
+    python simulate.py games.txt results.hsr --workers 8
+"""
+
+import argparse
+import sys
+import time
+from array import array
+
+from batch import chunked, parallel_map
+from letters import LETTER_BITS, word_letters
+
+
+MAGIC = b'HSR1'
+IN_PROGRESS = 0
+VICTORY = 1
+DEFEAT = 2
+
+
+def play(word, guesses):
+    """Return (status, guesses left) after making the guesses against word.
+    """
+    word_mask = word_letters(word)[0]
+    guessed_mask = 0
+    guesses_left = 8
+    word_guessed = None
+    for guess in guesses:
+        guess = guess.upper()
+        if len(guess) > 1:
+            # Only the first word guess of a game is accepted.
+            if word_guessed:
+                continue
+            word_guessed = guess
+            if guess != word:
+                guesses_left -= 1
+        else:
+            bit = LETTER_BITS.get(guess, 0)
+            guessed_mask |= bit
+            if not bit & word_mask:
+                guesses_left -= 1
+    if word_guessed == word or not word_mask & ~guessed_mask:
+        return VICTORY, guesses_left
+    return (DEFEAT if guesses_left <= 0 else IN_PROGRESS), guesses_left
+
+
+def play_line(line):
+    """Return (status, guesses left) for a game line, with the same result 
+    as play but using byte string operations over all the guesses at once 
+    instead of a loop over them.
+    """
+    line = line.strip().upper()
+    if not line.isascii():
+        word, _, guesses = line.partition(' ')
+        return play(word, guesses.split(',') if guesses else [])
+    word, _, guesses = line.encode('ascii').partition(b' ')
+    separators = guesses.count(b',')
+    if len(guesses) == 2 * separators + 1 and \
+            guesses[1::2] == b',' * separators:
+        # Only letter guesses, so the guesses are the letters guessed.
+        letters = guesses
+        empty_guesses = 0
+        word_guessed = None
+    else:
+        parts = guesses.split(b',') if guesses else []
+        letters = b''.join([part for part in parts if len(part) == 1])
+        empty_guesses = parts.count(b'')
+        word_guessed = next((part for part in parts if len(part) > 1), None)
+    # Deleting the separators and the letters of the word from the letters 
+    # guessed leaves the wrong ones; deleting the letters guessed from the 
+    # word leaves the ones still to find.
+    guesses_left = 8 - len(letters.translate(None, b',' + word)) - \
+        empty_guesses
+    if word_guessed is not None and word_guessed != word:
+        guesses_left -= 1
+    if word_guessed == word or not word.translate(None, letters):
+        return VICTORY, guesses_left
+    return (DEFEAT if guesses_left <= 0 else IN_PROGRESS), guesses_left
+
+
+def simulate_chunk(lines):
+    """Play a chunk of game lines, returning the packed results.
+    """
+    results = array('b')
+    for line in lines:
+        status, guesses_left = play_line(line)
+        results.append(status)
+        results.append(max(guesses_left, -128))
+    return results.tobytes()
+
+
+def simulate_stream(lines, output, workers=None, chunk_size=10000):
+    """Play every game line and write the results to a binary file object,
+    a chunk at a time. Returns the number of games played.
+    """
+    output.write(MAGIC)
+    games = 0
+    games_lines = (line for line in lines if line.strip())
+    for results in parallel_map(simulate_chunk, chunked(games_lines,
+            chunk_size), workers):
+        output.write(results)
+        games += len(results) // 2
+    return games
+
+
+def read_results(path):
+    """Yield (status, guesses left) for every game in a results file.
+    """
+    with open(path, 'rb') as results_file:
+        if results_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a simulation results file.')
+        while True:
+            data = results_file.read(1 << 16)
+            if not data:
+                return
+            results = array('b', data)
+            for index in range(0, len(results), 2):
+                yield results[index], results[index + 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay games in bulk and '
+        'write their outcomes to a compact results file.')
+    parser.add_argument('games', help="file of game lines, or '-' for stdin")
+    parser.add_argument('output', help='results file to write')
+    parser.add_argument('--workers', type=int, default=None,
+        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    games_file = sys.stdin if args.games == '-' else open(args.games)
+    start = time.perf_counter()
+    try:
+        with open(args.output, 'wb') as output:
+            games = simulate_stream(games_file, output, args.workers,
+                args.chunk_size)
+    finally:
+        if games_file is not sys.stdin:
+            games_file.close()
+    elapsed = time.perf_counter() - start
+    print(f'{games} games in {elapsed:.2f}s '
+        f'({games / elapsed if elapsed else 0:.0f} games/s)', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Guess solver for hints and word difficulty ratings.
+
+The words are indexed once per word length: for every (position, letter)
+there is a bitset (a Python int) of the words with that letter at that
+position, and for every letter a bitset of the words containing it. The
+words consistent with a game are then a few bitwise operations on those
+ints, whatever the size of the dictionary, and counting them is
+int.bit_count. Candidate sets and the chosen guesses are memoized by game
+state, which the difficulty scorer relies on: games for different words
+share most of their early states.
+
+The best letter is the one that splits the candidates into the smallest
+groups (the positions where the letter would appear, or that it does not
+appear), which minimises the expected number of candidates left after
+guessing it.
+
+Rate every word of a dictionary by the wrong guesses the solver makes on
+it, hardest first, across one worker process per CPU:
+
+    python solver.py words.txt       # or a word store file, words.hws
+"""
+
+import argparse
+import string
+import sys
+from functools import lru_cache
+
+from batch import chunked, parallel_map
+from letters import word_letters
+from wordstore import MAGIC, WordStore
+
+
+LETTERS = string.ascii_uppercase
+MAX_WRONG_GUESSES = 8
+# Below this many candidates it is cheaper to split the candidate words 
+# one by one than to split bitsets the size of the whole length group.
+SMALL_CANDIDATE_COUNT = 512
+# The memoized game states are bounded so that their candidate bitsets 
+# take about CACHE_BYTES at most, within these entry counts.
+CACHE_BYTES = 64 * 1024 * 1024
+MIN_CACHE_SIZE = 1024
+MAX_CACHE_SIZE = 65536
+
+
+class _LengthIndex:
+    """The words of one length and their letter bitsets.
+    """
+    def __init__(self, words):
+        self.words = words
+        self.all = (1 << len(words)) - 1
+        self.word_bits = {word: 1 << index for index, word in
+            enumerate(words)}
+        size = len(words) // 8 + 1
+        positions = {}
+        letters = {}
+        for index, word in enumerate(words):
+            byte, bit = index >> 3, 1 << (index & 7)
+            for position, letter in enumerate(word):
+                bits = positions.get((position, letter))
+                if bits is None:
+                    bits = positions[position, letter] = bytearray(size)
+                bits[byte] |= bit
+            for letter in set(word):
+                bits = letters.get(letter)
+                if bits is None:
+                    bits = letters[letter] = bytearray(size)
+                bits[byte] |= bit
+        self.positions = {key: int.from_bytes(bits, 'little') for key, bits
+            in positions.items()}
+        self.letters = {key: int.from_bytes(bits, 'little') for key, bits in
+            letters.items()}
+
+
+def cache_size_for(group_size):
+    """Return how many game states to memoize when the largest group of 
+    words of one length has group_size words.
+    """
+    bitset_bytes = group_size // 8 + 1
+    return max(MIN_CACHE_SIZE, min(MAX_CACHE_SIZE, CACHE_BYTES // 
+        bitset_bytes))
+
+
+class Solver:
+    """Finds the candidate words and the best next letter for a game.
+    """
+    def __init__(self, words, cache_size=None):
+        by_length = {}
+        for word in words:
+            by_length.setdefault(len(word), []).append(word)
+        self._indexes = {length: _LengthIndex(group) for length, group in
+            by_length.items()}
+        if cache_size is None:
+            cache_size = cache_size_for(max(map(len, by_length.values()), 
+                default=0))
+        self.candidates = lru_cache(cache_size)(self._candidates)
+        self.best_guess = lru_cache(cache_size)(self._best_guess)
+
+    def _candidates(self, display, wrong):
+        """Return the bitset of words matching display, where unknown
+        letters are '_', that contain none of the wrong letters and are not
+        one of the wrong word guesses.
+        """
+        index = self._indexes.get(len(display))
+        if index is None:
+            return 0
+        candidates = index.all
+        found = set(display) - {'_'}
+        for position, letter in enumerate(display):
+            if letter != '_':
+                candidates &= index.positions.get((position, letter), 0)
+            else:
+                # A letter that was found appears in every position it is
+                # in, so no candidate may have it at an unknown position.
+                for found_letter in found:
+                    candidates &= ~index.positions.get((position,
+                        found_letter), 0)
+        for guess in wrong:
+            if len(guess) > 1:
+                candidates &= ~index.word_bits.get(guess, 0)
+            else:
+                candidates &= ~index.letters.get(guess, 0)
+        return candidates
+
+    def count(self, display, wrong=frozenset()):
+        """Return the number of words consistent with the game.
+        """
+        return self.candidates(display, wrong).bit_count()
+
+    def words(self, display, wrong=frozenset()):
+        """Return the words consistent with the game.
+        """
+        index = self._indexes.get(len(display))
+        candidates = self.candidates(display, wrong)
+        words = []
+        while candidates:
+            low = candidates & -candidates
+            words.append(index.words[low.bit_length() - 1])
+            candidates ^= low
+        return words
+
+    def _best_guess(self, display, wrong):
+        """Return the letter that best splits the candidates, or None if
+        there are no candidates or no letters left to guess.
+        """
+        candidates = self.candidates(display, wrong)
+        if not candidates:
+            return None
+        if candidates.bit_count() <= SMALL_CANDIDATE_COUNT:
+            return self._best_guess_by_word(display, wrong)
+        index = self._indexes[len(display)]
+        unknown = [position for position, letter in enumerate(display) if
+            letter == '_']
+        best = None
+        for letter in LETTERS:
+            if letter in display or letter in wrong:
+                continue
+            having = candidates & index.letters.get(letter, 0)
+            # Split the candidates with the letter by where it appears.
+            groups = [having] if having else []
+            for position in unknown:
+                at_position = index.positions.get((position, letter), 0)
+                if not at_position & having:
+                    continue
+                split = []
+                for group in groups:
+                    split.extend(part for part in (group & at_position,
+                        group & ~at_position) if part)
+                groups = split
+            without = (candidates & ~having).bit_count()
+            remaining = without * without + sum(group.bit_count() ** 2 for
+                group in groups)
+            # Fewer candidates left is better, then a more likely letter.
+            score = (remaining, -having.bit_count())
+            if best is None or score < best[0]:
+                best = (score, letter)
+        return best and best[1]
+
+    def _best_guess_by_word(self, display, wrong):
+        words = self.words(display, wrong)
+        groups = {}
+        for word in words:
+            for letter, positions in word_letters(word)[1].items():
+                if letter in display or letter in wrong:
+                    continue
+                letter_groups = groups.setdefault(letter, {})
+                letter_groups[positions] = letter_groups.get(positions, 0) + 1
+        best = None
+        for letter in LETTERS:
+            if letter in display or letter in wrong:
+                continue
+            counts = groups.get(letter, {}).values()
+            having = sum(counts)
+            without = len(words) - having
+            score = (without * without + sum(count * count for count in 
+                counts), -having)
+            if best is None or score < best[0]:
+                best = (score, letter)
+        return best and best[1]
+
+    def hint(self, session):
+        """Return a hint for a session: the best letter to guess and the
+        number of words still possible (and the word itself once only one
+        is left).
+        """
+        display = ''.join(session.word_display)
+        wrong = frozenset([letter for letter in session.letters_guessed if
+            letter not in display] + ([session.word_guessed] if
+            session.word_guessed else []))
+        hint = {'letter': None, 'candidates': self.count(display, wrong)}
+        if session.victory or session.defeat:
+            return hint
+        hint['letter'] = self.best_guess(display, wrong)
+        if hint['candidates'] == 1:
+            hint['word'] = self.words(display, wrong)[0]
+        return hint
+
+    def score(self, word):
+        """Play word with the solver's guesses, guessing the word as soon
+        as it is the only candidate. Returns the number of wrong guesses,
+        which is MAX_WRONG_GUESSES or more if the solver lost.
+        """
+        display = '_' * len(word)
+        wrong = frozenset()
+        while '_' in display and len(wrong) < MAX_WRONG_GUESSES:
+            if self.count(display, wrong) <= 1:
+                break
+            letter = self.best_guess(display, wrong)
+            if letter is None:
+                break
+            if letter in word:
+                display = ''.join(char if char == letter else shown for
+                    char, shown in zip(word, display))
+            else:
+                wrong |= {letter}
+        return len(wrong)
+
+
+def load_words(path):
+    """Read words from a word store file or a text file of one per line.
+    """
+    with open(path, 'rb') as words_file:
+        is_store = words_file.read(len(MAGIC)) == MAGIC
+    if is_store:
+        return list(WordStore.open(path))
+    with open(path) as words_file:
+        return [line.strip().upper() for line in words_file if line.strip()]
+
+
+_worker_solvers = {}
+
+
+def _score_chunk(job):
+    # Each worker process builds the solver for the dictionary once.
+    path, words = job
+    if path not in _worker_solvers:
+        _worker_solvers[path] = Solver(load_words(path))
+    solver = _worker_solvers[path]
+    return [(solver.score(word), word) for word in words]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rate every word of a '
+        'dictionary by how many wrong guesses the solver makes on it, '
+        'hardest first.')
+    parser.add_argument('words', help='word store file, or text file with '
+        'one word per line')
+    parser.add_argument('--workers', type=int, default=None,
+        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    words = load_words(args.words)
+    scores = []
+    for chunk_scores in parallel_map(_score_chunk, ((args.words, chunk) for
+            chunk in chunked(words, args.chunk_size)), args.workers):
+        scores.extend(chunk_scores)
+    scores.sort(key=lambda item: (-item[0], item[1]))
+    for wrong, word in scores:
+        result = 'lost' if wrong >= MAX_WRONG_GUESSES else 'won'
+        print(f'{word}\t{wrong}\t{result}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
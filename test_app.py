@@ -4,7 +4,7 @@
 import pytest
 
 from app import create_app
-from session import Session
+from session import ConfigError, Session, load_config
 
 
 @pytest.fixture
@@ -13,6 +13,15 @@ def client():
 
     yield app.test_client()
 
+@pytest.fixture
+def compact_client(monkeypatch):
+    monkeypatch.setenv('HANGMAN_TOKEN_FORMAT', 'compact')
+    app = create_app(testing=True)
+
+    yield app.test_client()
+    monkeypatch.undo()
+    load_config()
+
 def test_new_game_empty(client):
     """Check that a random word is picked.
     """
@@ -65,6 +74,21 @@ def test_new_game_all_words_guessed(client):
     assert b'<input type="submit" value="Undo">' in response.data
     assert b'<input type="submit" value="New Game">' not in response.data
 
+def test_new_game_exhausted(client):
+    """Check that an error is shown when every word has been played.
+    """
+    session = Session()
+    session.previous_word_indexes = [0, 1, 2, 3, 4, 5, 6, 7]
+    session.current_word_index = 8
+    session.guesses = ['BIFROST']
+    session.encode_url()
+    encoded_url = session.get_encoded_url()
+    response = client.post(f'/session/{encoded_url}/games')
+    assert response.status_code == 200
+    assert b'You have played every word in this session.' in response.data
+    assert b'B I F R O S T' in response.data
+    assert b'<input type="submit" value="New Game">' not in response.data
+
 def test_guess_word_incorrect(client):
     """Check that guesses are updated correctly.
     """
@@ -323,4 +347,363 @@ def test_undo_no_guesses(client):
     assert b'Guesses left: 8' in response.data
     assert b'<input type="submit" value="Go">' in response.data
     assert b'<input type="submit" value="Undo">' in response.data
-    assert b'<input type="submit" value="New Game">' not in response.data     
\ No newline at end of file
+    assert b'<input type="submit" value="New Game">' not in response.data     
+
+def test_page_cache_and_etag():
+    """Check that repeat loads are served from the cache, and that a 
+    matching If-None-Match gets a 304.
+    """
+    app = create_app(testing=True)
+    client = app.test_client()
+    page_cache = app.extensions['page_cache']
+    session = Session()
+    session.current_word_index = 2
+    session.guesses = ['E']
+    session.encode_url()
+    url = f'/session/{session.get_encoded_url()}'
+    first = client.get(url)
+    second = client.get(url)
+    assert first.data == second.data
+    assert page_cache.stats()['hits'] == 1
+    assert page_cache.stats()['misses'] == 1
+    etag = first.headers['ETag']
+    assert etag == second.headers['ETag']
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert page_cache.stats()['hits'] == 1
+    session.guesses = ['E', 'A']
+    session.encode_url()
+    other = client.get(f'/session/{session.get_encoded_url()}', 
+        headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+
+def test_etag_depends_on_words(monkeypatch, tmp_path):
+    """Check that a page gets a new ETag when the word table changes, so 
+    a stale page is not answered with a 304.
+    """
+    from wordstore import write_word_store
+
+    session = Session()
+    session.current_word_index = 2
+    session.guesses = ['E']
+    session.encode_url()
+    url = f'/session/{session.get_encoded_url()}'
+    response = create_app(testing=True).test_client().get(url)
+    etag = response.headers['ETag']
+    words_path = tmp_path / 'words.hws'
+    write_word_store(words_path, ['FINESSE', 'WHITMAN', 'SEVENS'])
+    monkeypatch.setenv('HANGMAN_WORDS', str(words_path))
+    try:
+        response = create_app(testing=True).test_client().get(url, 
+            headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert b'_ E _ E _ _' in response.data
+    finally:
+        monkeypatch.undo()
+        load_config()
+
+def test_cache_headers(client):
+    """Check that session pages and hashed static files are cacheable, and 
+    that actions and static URLs with a stale hash are not.
+    """
+    response = client.get('/')
+    assert response.status_code == 303
+    assert 'no-store' in response.headers['Cache-Control']
+    page = client.get(response.location)
+    assert 'public' in page.headers['Cache-Control']
+    assert 'immutable' in page.headers['Cache-Control']
+    assert page.headers['ETag'].startswith('"')
+    guess = client.post(f'{response.location}/guesses', data={'guess': 'E'})
+    assert guess.status_code == 303
+    assert 'no-store' in guess.headers['Cache-Control']
+    assert b'replaceState' not in page.data
+    assert b'/static/style.css?v=' in page.data
+    start = page.data.index(b'/static/style.css?v=')
+    static_url = page.data[start:page.data.index(b'"', start)].decode()
+    static = client.get(static_url)
+    assert static.status_code == 200
+    assert 'max-age=31536000' in static.headers['Cache-Control']
+    assert 'no-cache' not in static.headers['Cache-Control']
+    static.close()
+    for stale_url in ('/static/style.css?v=0123456789ab', 
+            '/static/style.css'):
+        stale = client.get(stale_url)
+        assert stale.status_code == 200
+        assert 'immutable' not in stale.headers.get('Cache-Control', '')
+        stale.close()
+    assert client.get('/static/missing.css?v=0123456789ab').status_code == \
+        404
+
+def test_direct_guess_mode(monkeypatch):
+    """Check that guesses render the new page in one response when direct 
+    guess mode is on.
+    """
+    monkeypatch.setenv('HANGMAN_DIRECT_GUESS', '1')
+    client = create_app(testing=True).test_client()
+    session = Session()
+    session.current_word_index = 4
+    session.guesses = ['A']
+    session.encode_url()
+    encoded_url = session.get_encoded_url()
+    response = client.post(f'/session/{encoded_url}/guesses', 
+        data={'guess': 'R'})
+    assert response.status_code == 200
+    assert b'_ A _ _ _ R A' in response.data
+    assert b'Guesses: A R' in response.data
+    session.add_guess('R')
+    session.encode_url()
+    location = f'/session/{session.get_encoded_url()}'
+    assert response.headers['Content-Location'] == location
+    assert f"history.replaceState(null, '', '{location}')".encode() in \
+        response.data
+    response = client.post(f'{location}/guesses', data={'guess': 'PALMYRA'})
+    assert response.status_code == 200
+    assert b'Victory!' in response.data
+    assert response.headers['Content-Location'] != location
+    assert client.get(location).data.count(b'replaceState') == 1
+
+def test_api_actions(client):
+    """Check that a batch of actions is applied in one call, with an 
+    outcome for each action.
+    """
+    session = Session()
+    session.current_word_index = 6
+    session.encode_url()
+    response = client.post('/api/actions', json={
+        'session': session.get_encoded_url(), 
+        'actions': [{'action': 'guess', 'guess': 'e'}, 
+            {'action': 'guess', 'guess': 'GOLDEN'}, 
+            {'action': 'guess', 'guess': 'BRIDGE'}, 
+            {'action': 'undo'}, {'action': 'guess', 'guess': 'R'}]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [result['ok'] for result in data['results']] == [True, True, 
+        False, True, True]
+    assert data['results'][2]['errors'] == [
+        'You have already guessed a word in this game.']
+    assert data['state'] == {'word_display': '_ R _ _ _ E', 
+        'guesses': ['E', 'R'], 'guesses_left': 8, 'victory': False, 
+        'defeat': False, 'prev_word_count': 0}
+    page = client.get(f"/session/{data['session']}")
+    assert b'Guesses: E R' in page.data
+
+def test_api_new_session_and_errors(client):
+    """Check that a session is started when none is given, and that bad 
+    requests are rejected with JSON errors.
+    """
+    response = client.post('/api/actions', json={'actions': [
+        {'action': 'new_game'}]})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['session']
+    assert data['state']['prev_word_count'] == 1
+    assert client.post('/api/actions', json=[]).status_code == 400
+    assert client.post('/api/actions', json={'actions': [
+        {'action': 'jump'}]}).status_code == 400
+    response = client.post('/api/actions', json={'session': 'abc'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid session URL.'}
+    response = client.post('/api/actions', json={'session': 5})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    response = client.post('/api/actions', json={'session': data['session'], 
+        'actions': [{'action': 'guess', 'guess': guess} for guess in 
+        ['!', 'ab cd', '\u00e9', 'A-B', 'A,B', 'e']]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [result['ok'] for result in data['results']] == [False] * 5 + [
+        True]
+    assert data['state']['guesses'] == ['E']
+    assert Session(data['session']).guesses == ['E']
+    response = client.post(f"/session/{data['session']}/guesses", 
+        data={'guess': 'A-B'})
+    assert response.status_code == 200
+    assert b'Guesses may only contain' in response.data
+
+def test_create_app_without_key(monkeypatch):
+    """Check that startup fails when the key is missing or a setting is 
+    invalid.
+    """
+    monkeypatch.delenv('HANGMAN_KEY')
+    with pytest.raises(ConfigError):
+        create_app(testing=True)
+    monkeypatch.undo()
+    monkeypatch.setenv('HANGMAN_PAGE_CACHE_SIZE', 'many')
+    with pytest.raises(ConfigError):
+        create_app(testing=True)
+
+def test_compact_format(compact_client):
+    """Check that a game can be played with compact URLs.
+    """
+    response = compact_client.get('/')
+    assert response.location.startswith('/session/c')
+    response = compact_client.post(f'{response.location}/guesses', 
+        data={'guess': 'E'})
+    assert response.location.startswith('/session/c')
+    response = compact_client.get(response.location)
+    assert b'Guesses: E' in response.data
+    assert b'Undo' in response.data
+
+def test_invalid_session_url(client):
+    """Check that undecodable and tampered URLs are rejected with a 400.
+    """
+    assert client.get('/session/abc').status_code == 400
+    assert client.get('/session/sAAAAAAAAAAAAAAAAAAAAAAA').status_code == 400
+    assert client.post('/session/abc/guesses', 
+        data={'guess': 'E'}).status_code == 400
+    codec = Session().codec
+    for malformed in ['ABCDEFG', codec.encode('25-7'), codec.encode('5-99-E')]:
+        assert client.post(f'/session/{malformed}/guesses', 
+            data={'guess': 'E'}).status_code == 400
+        assert client.post(f'/session/{malformed}/undo').status_code == 400
+
+def test_word_index_out_of_range(client):
+    """Check that URLs with a previous word that is not in the word table 
+    are rejected with a 400 in every format, and not only when used.
+    """
+    from tokens import encode_compact
+
+    config = Session().config
+    for url in [config.codec.encode('0123456789-1-'), 
+            config.codec.encode('2,99,-1-E'), config.sealer.seal([99], 1, []), 
+            encode_compact(config.compact_keystream, [99], 1, [])]:
+        assert client.get(f'/session/{url}').status_code == 400
+        assert client.post(f'/session/{url}/undo').status_code == 400
+        assert client.post(f'/session/{url}/guesses', 
+            data={'guess': 'E'}).status_code == 400
+        response = client.post('/api/actions', json={'session': url, 
+            'actions': [{'action': 'undo'}]})
+        assert response.status_code == 400
+
+def test_metrics(monkeypatch):
+    """Check that phases, requests and errors are exposed at /metrics when 
+    metrics are enabled, and that there is no endpoint otherwise.
+    """
+    monkeypatch.setenv('HANGMAN_METRICS', '1')
+    client = create_app(testing=True).test_client()
+    session = Session()
+    session.current_word_index = 6
+    session.guesses = ['BRIDGE']
+    session.encode_url()
+    encoded_url = session.get_encoded_url()
+    client.get(f'/session/{encoded_url}')
+    client.post(f'/session/{encoded_url}/guesses', data={'guess': 'GOLDEN'})
+    client.get('/session/abc')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    for phase in ('decode', 'logic', 'encode', 'render'):
+        assert f'hangman_phase_seconds_count{{phase="{phase}"}}' in text
+    assert 'hangman_request_seconds_count{endpoint="load_game"} 2' in text
+    assert 'hangman_errors_total{kind="invalid_token"} 1' in text
+    assert 'hangman_errors_total{kind="word_already_guessed"} 1' in text
+    assert 'hangman_page_cache_misses_total 2' in text
+    monkeypatch.delenv('HANGMAN_METRICS')
+    assert create_app(testing=True).test_client().get(
+        '/metrics').status_code == 404
+
+def test_profiling(monkeypatch):
+    """Check that requests with the profiling header are profiled and the 
+    results can only be read with the header.
+    """
+    from profiling import PROFILE_HEADER, profile_token
+
+    monkeypatch.setenv('HANGMAN_PROFILE_RATE', '0')
+    client = create_app(testing=True).test_client()
+    headers = {PROFILE_HEADER: profile_token(load_config().key)}
+    session = Session()
+    session.current_word_index = 2
+    session.encode_url()
+    client.get(f'/session/{session.get_encoded_url()}', headers=headers)
+    client.get(f'/session/{session.get_encoded_url()}')
+    assert client.get('/admin/profile').status_code == 403
+    bad_header = {PROFILE_HEADER: 'caf\u00e9'}
+    assert client.get('/admin/profile', headers=bad_header).status_code == 403
+    assert client.get(f'/session/{session.get_encoded_url()}', 
+        headers=bad_header).status_code == 200
+    response = client.get('/admin/profile?sort=tottime', headers=headers)
+    assert response.status_code == 200
+    assert response.data.startswith(b'1 profiled requests')
+    assert b'decode_url' in response.data
+    assert client.get('/admin/profile?format=pstats', 
+        headers=headers).mimetype == 'application/octet-stream'
+    assert client.delete('/admin/profile', headers=headers).status_code == 204
+    assert client.get('/admin/profile', 
+        headers=headers).data == b'0 profiled requests\n'
+    monkeypatch.setenv('HANGMAN_PROFILE_RATE', 'often')
+    with pytest.raises(ConfigError):
+        create_app(testing=True)
+
+def test_hint(client):
+    """Check that the hint names a letter and the number of words left.
+    """
+    session = Session()
+    session.current_word_index = 6
+    session.guesses = ['E']
+    session.encode_url()
+    response = client.get(f'/session/{session.get_encoded_url()}/hint')
+    assert response.status_code == 200
+    assert response.get_json() == {'letter': 'B', 'candidates': 1, 
+        'word': 'BRIDGE'}
+    response = client.get('/session/abc/hint')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid session URL.'}
+
+def test_hints_disabled(monkeypatch):
+    """Check that the solver is built with the app, and that hints can be 
+    turned off.
+    """
+    assert 'solver' in create_app(testing=True).extensions
+    monkeypatch.setenv('HANGMAN_HINTS', '0')
+    app = create_app(testing=True)
+    assert 'solver' not in app.extensions
+    session = Session()
+    session.current_word_index = 6
+    session.encode_url()
+    assert app.test_client().get(
+        f'/session/{session.get_encoded_url()}/hint').status_code == 404
+
+def test_key_ring(monkeypatch):
+    """Check that URLs under an older key in the key ring keep working until 
+    the key expires, that new URLs use the current key, and that adding a 
+    key to the ring keeps the ETags of pages under the current key.
+    """
+    import os
+    import session as session_module
+
+    old_key = os.environ['HANGMAN_KEY']
+    session = Session()
+    session.current_word_index = 2
+    session.guesses = ['E']
+    session.encode_url()
+    old_url = f'/session/{session.get_encoded_url()}'
+    monkeypatch.setenv('HANGMAN_KEY', 'NEWKEY9876543210,-' * 4)
+    monkeypatch.setenv('HANGMAN_KEY_VERSION', '2')
+    client = create_app(testing=True).test_client()
+    monkeypatch.setenv('HANGMAN_KEY_RING', f':{old_key}:2000000000')
+    ring_client = create_app(testing=True).test_client()
+    try:
+        response = ring_client.get(old_url)
+        assert response.status_code == 200
+        assert b'Guesses: E' in response.data
+        assert b'/session/2.' in response.data
+        assert client.get(old_url).status_code == 400
+        response = ring_client.post(f'{old_url}/guesses', 
+            data={'guess': 'T'})
+        assert response.location.startswith('/session/2.')
+        new_url = response.location
+        assert b'Guesses: E T' in ring_client.get(new_url).data
+        assert ring_client.post(f'{new_url}/guesses', data={'guess': 'A'}
+            ).location.startswith(new_url)
+        assert ring_client.get(new_url).headers['ETag'] == client.get(
+            new_url).headers['ETag']
+        monkeypatch.setattr(session_module.time, 'time', lambda: 2000000000)
+        assert ring_client.get(old_url).status_code == 400
+        assert ring_client.get(new_url).status_code == 200
+    finally:
+        monkeypatch.undo()
+        load_config()
@@ -0,0 +1,79 @@
+"""Test all logic in asgi.py
+"""
+
+import asyncio
+
+import pytest
+
+from app import create_app
+from asgi import WsgiToAsgi
+from session import Session
+
+
+@pytest.fixture
+def asgi_app():
+    app = WsgiToAsgi(create_app(testing=True), max_workers=2)
+
+    yield app
+    app.executor.shutdown()
+
+def call(app, method, path, body=b'', headers=()):
+    """Run one HTTP request through the ASGI app, returning (status, 
+    headers, body).
+    """
+    scope = {'type': 'http', 'method': method, 'path': path, 
+        'query_string': b'', 'headers': list(headers), 'http_version': '1.1',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1234)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+def test_get_session_page(asgi_app):
+    """Check that a session page is rendered through the adapter.
+    """
+    session = Session()
+    session.current_word_index = 4
+    session.guesses = ['A']
+    session.encode_url()
+    status, headers, body = call(asgi_app, 'GET', 
+        f'/session/{session.get_encoded_url()}')
+    assert status == 200
+    assert headers[b'content-type'] == b'text/html; charset=utf-8'
+    assert b'_ A _ _ _ _ A' in body
+
+def test_post_guess(asgi_app):
+    """Check that form posts reach the app and redirects come back.
+    """
+    session = Session()
+    session.current_word_index = 4
+    session.encode_url()
+    status, headers, body = call(asgi_app, 'POST', 
+        f'/session/{session.get_encoded_url()}/guesses', body=b'guess=R', 
+        headers=[(b'content-type', b'application/x-www-form-urlencoded')])
+    assert status == 303
+    status, headers, body = call(asgi_app, 'GET', 
+        headers[b'location'].decode())
+    assert b'Guesses: R' in body
+
+def test_lifespan(asgi_app):
+    """Check that startup and shutdown are acknowledged.
+    """
+    messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(asgi_app({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
@@ -0,0 +1,22 @@
+"""Test all logic in batch.py
+"""
+
+from batch import chunked, parallel_map
+
+
+class TestBatch:
+    """Test the helpers in batch.py
+    """
+
+    def test_chunked(self):
+        """Check that items are split into lists of the chunk size.
+        """
+        assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+        assert list(chunked([], 3)) == []
+
+    def test_parallel_map_keeps_order(self):
+        """Check that results come back in order from a process pool.
+        """
+        assert list(parallel_map(abs, range(0, -50, -1), workers=3, 
+            window=4)) == list(range(50))
+        assert list(parallel_map(abs, [-1, -2], workers=1)) == [1, 2]
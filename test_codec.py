@@ -0,0 +1,104 @@
+"""Test all logic in codec.py
+"""
+
+import random
+
+import pytest
+
+from codec import CHAR_MAP, Codec, Keystream, get_codec, keystream_bytes
+
+
+def shift_by_hand(key, data, direction):
+    """The original per-character implementation of the URL scheme.
+    """
+    shifted = []
+    for char_index in range(len(data)):
+        char_value = CHAR_MAP.index(data[char_index])
+        key_value = CHAR_MAP.index(key[char_index])
+        shifted.append(CHAR_MAP[(char_value + direction * key_value) % 38])
+    return ''.join(shifted)
+
+
+class TestCodec:
+    """Test the Codec class in codec.py
+    """
+
+    def test_matches_original_scheme(self):
+        """Check that encoding and decoding are byte-for-byte compatible 
+        with shifting each character by hand.
+        """
+        rng = random.Random(0)
+        key = ''.join(rng.choice(CHAR_MAP) for _ in range(100))
+        codec = Codec(key)
+        for length in range(101):
+            data = ''.join(rng.choice(CHAR_MAP) for _ in range(length))
+            assert codec.encode(data) == shift_by_hand(key, data, 1)
+            assert codec.decode(data) == shift_by_hand(key, data, -1)
+            assert codec.decode(codec.encode(data)) == data
+
+    def test_invalid_input(self):
+        """Check that characters outside the character map are rejected.
+        """
+        codec = Codec('ABC')
+        with pytest.raises(ValueError):
+            codec.decode('a')
+        with pytest.raises(ValueError):
+            codec.encode('A' * 10 + 'a')
+
+    def test_beyond_key(self):
+        """Check that strings longer than the key round trip, keep the 
+        original scheme for as far as the key goes, and are encoded the 
+        same however the offsets were extended.
+        """
+        rng = random.Random(0)
+        key = ''.join(rng.choice(CHAR_MAP) for _ in range(100))
+        data = ''.join(rng.choice(CHAR_MAP) for _ in range(20000))
+        codec = Codec(key)
+        encoded = codec.encode(data)
+        assert encoded[:100] == shift_by_hand(key, data[:100], 1)
+        assert codec.decode(encoded) == data
+        assert len(codec.offsets) >= 20000
+        assert set(codec.offsets[100:]) == set(range(len(CHAR_MAP)))
+        stepped = Codec(key)
+        pieces = [stepped.encode(data[start:start + 150], start) for start 
+            in range(0, len(data), 150)]
+        assert ''.join(pieces) == encoded
+        assert stepped.decode(encoded[15000:], 15000) == data[15000:]
+        assert Codec(key).find(encoded, data[19999], 19999) == 19999
+        assert Codec(key).rfind(encoded[10000:], data[10000], 10000) >= 0
+        assert Codec('ABC').decode(Codec('ABC').encode('AAAA')) == 'AAAA'
+        assert Codec('ABD').encode('A' * 50)[3:] != Codec('ABC').encode(
+            'A' * 50)[3:]
+
+    def test_find(self):
+        """Check that characters are found by their decoded value.
+        """
+        codec = Codec('KEY' * 10)
+        encoded = codec.encode('12-3-A,B,CD')
+        assert codec.find(encoded, '-') == 2
+        assert codec.find(encoded, '-', 3) == 4
+        assert codec.find(encoded, 'Z') == -1
+        assert codec.rfind(encoded, ',') == 8
+        assert codec.rfind(encoded[5:], ',', 5) == 3
+        assert codec.rfind(encoded[5:6], ',', 5) == -1
+
+    def test_get_codec_is_shared(self):
+        """Check that the codec for a key is only built once.
+        """
+        assert get_codec('KEY') is get_codec('KEY')
+
+
+class TestKeystream:
+    """Test the Keystream class in codec.py
+    """
+
+    def test_take_is_stable(self):
+        """Check that growing the stream never changes earlier bytes.
+        """
+        stream = Keystream('KEY', 'test')
+        first = stream.take(5)
+        longer = stream.take(100)
+        assert len(longer) == 100
+        assert longer[:5] == first
+        assert longer == keystream_bytes(b'test:KEY', 100)
+        assert Keystream('KEY', 'other').take(5) != first
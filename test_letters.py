@@ -0,0 +1,41 @@
+"""Test all logic in letters.py
+"""
+
+import random
+
+from letters import LETTER_BITS, guess_mask, masked_display, word_letters
+
+
+class TestLetters:
+    """Test the bitmask helpers in letters.py
+    """
+
+    def test_word_letters(self):
+        """Check the mask and letter positions of a word.
+        """
+        mask, positions = word_letters('VECCHIO')
+        assert mask == (LETTER_BITS['V'] | LETTER_BITS['E'] | LETTER_BITS['C'] 
+            | LETTER_BITS['H'] | LETTER_BITS['I'] | LETTER_BITS['O'])
+        assert positions['C'] == (2, 3)
+        assert positions['O'] == (6,)
+        assert word_letters('VECCHIO') is word_letters('VECCHIO')
+
+    def test_guess_mask(self):
+        """Check that only single letter guesses are included.
+        """
+        assert guess_mask(['E', 'BRIDGE', 'T']) == (LETTER_BITS['E'] | 
+            LETTER_BITS['T'])
+        assert guess_mask([]) == 0
+
+    def test_masked_display(self):
+        """Check that the display matches testing each letter against the 
+        guesses.
+        """
+        rng = random.Random(0)
+        alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        for _ in range(200):
+            word = ''.join(rng.choice(alphabet) for _ in range(rng.randint(
+                1, 12)))
+            guesses = rng.sample(alphabet, rng.randint(0, 26)) + ['WORD']
+            expected = [char if char in guesses else '_' for char in word]
+            assert masked_display(word, guess_mask(guesses)) == expected
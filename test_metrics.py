@@ -0,0 +1,65 @@
+"""Test all logic in metrics.py
+"""
+
+from metrics import NULL_METRICS, Counter, Histogram, Metrics
+
+
+class TestHistogram:
+    """Test the Histogram class in metrics.py
+    """
+
+    def test_buckets(self):
+        """Check that observations fall into cumulative buckets.
+        """
+        histogram = Histogram('h', 'Help.', 'phase', (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe('decode', value)
+        assert histogram.samples('decode') == ([2, 3, 4], 2.65, 4)
+        assert histogram.samples('render') == ([0, 0, 0], 0.0, 0)
+
+    def test_expose(self):
+        """Check the Prometheus text format of a histogram.
+        """
+        histogram = Histogram('h', 'Help.', 'phase', (0.5,))
+        histogram.observe('decode', 0.25)
+        assert histogram.expose() == ['# HELP h Help.', '# TYPE h histogram', 
+            'h_bucket{phase="decode",le="0.5"} 1', 
+            'h_bucket{phase="decode",le="+Inf"} 1', 
+            'h_sum{phase="decode"} 0.25', 'h_count{phase="decode"} 1']
+
+
+class TestMetrics:
+    """Test the Metrics and NullMetrics classes in metrics.py
+    """
+
+    def test_counter(self):
+        """Check that counters add up per label and escape label values.
+        """
+        counter = Counter('c', 'Help.', 'kind')
+        counter.inc('a')
+        counter.inc('a')
+        counter.inc('say "hi"')
+        assert counter.value('a') == 2
+        assert counter.expose()[2:] == ['c{kind="a"} 2', 
+            'c{kind="say \\"hi\\""} 1']
+
+    def test_phase_and_expose(self):
+        """Check that phases are timed and everything is exposed.
+        """
+        metrics = Metrics()
+        with metrics.phase('decode'):
+            pass
+        metrics.count_error('invalid_token')
+        metrics.collect('hits_total', 'counter', 'Hits.', lambda: 3)
+        text = metrics.expose()
+        assert 'hangman_phase_seconds_count{phase="decode"} 1\n' in text
+        assert 'hangman_errors_total{kind="invalid_token"} 1\n' in text
+        assert '# TYPE hits_total counter\nhits_total 3\n' in text
+
+    def test_null_metrics(self):
+        """Check that disabled metrics accept every call.
+        """
+        assert not NULL_METRICS.enabled
+        with NULL_METRICS.phase('decode'):
+            NULL_METRICS.count_error('invalid_token')
+            NULL_METRICS.observe_request('home', 0.1)
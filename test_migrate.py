@@ -0,0 +1,103 @@
+"""Test all logic in migrate.py
+"""
+
+import io
+import sys
+
+from migrate import main, migrate_token, read_tokens
+from session import Session, SessionConfig
+
+
+OLD_KEY = 'OLDKEY0123456789-,' * 6
+NEW_KEY = 'NEWKEY9876543210,-' * 6
+
+
+def sample_tokens(config):
+    tokens = []
+    for index, guesses in enumerate([[], ['E'], ['E', 'T', 'BRIDGE']]):
+        session = Session(config=config)
+        session.previous_word_indexes = list(range(index))
+        session.current_word_index = 6
+        session.guesses = guesses
+        session.encode_url()
+        tokens.append(session.encoded_url)
+    return tokens
+
+
+class TestMigrate:
+    """Test the migration functions in migrate.py
+    """
+
+    def test_migrate_token(self):
+        """Check that a token keeps its state under the new key and format.
+        """
+        old_config = SessionConfig.from_key(OLD_KEY)
+        # Legacy URLs can hold empty guesses, which count as wrong ones.
+        tokens = sample_tokens(old_config) + [old_config.codec.encode(
+            '-6-,Q')]
+        for token_format in ('legacy', 'compact', 'sealed'):
+            new_config = SessionConfig.from_key(NEW_KEY, 
+                token_format=token_format)
+            for token in tokens:
+                old = Session(token, old_config)
+                new = Session(migrate_token(token, old_config, new_config), 
+                    new_config)
+                assert (new.previous_word_indexes, new.current_word_index, 
+                    new.guesses, new.guesses_left) == (
+                    old.previous_word_indexes, old.current_word_index, 
+                    old.guesses, old.guesses_left)
+            assert new.guesses == ['', 'Q'] and new.guesses_left == 6
+
+    def test_read_tokens(self):
+        """Check that tokens are read per line or taken from log lines.
+        """
+        assert list(read_tokens(['A1B\n', '\n', ' C2D \n'])) == ['A1B', 
+            'C2D']
+        log = ['{"path": "/session/AB,C-D/guesses", "status": 303}\n', 
+            'GET /session/cXYZ_1 /session/sQ-2?x=1\n', 'GET /\n']
+        assert list(read_tokens(log, extract=True)) == ['AB,C-D', 'cXYZ_1', 
+            'sQ-2']
+        assert list(read_tokens(['GET /session/2.sQ-2/undo\n'], 
+            extract=True)) == ['2.sQ-2']
+
+    def test_key_ring(self, monkeypatch, capsys):
+        """Check that tokens under the keys in the key ring are moved onto 
+        the current key and its version.
+        """
+        tokens = sample_tokens(SessionConfig.from_key(OLD_KEY))
+        environ = {'HANGMAN_KEY': NEW_KEY, 'HANGMAN_KEY_VERSION': '2', 
+            'HANGMAN_KEY_RING': f':{OLD_KEY}'}
+        monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(tokens)))
+        assert main(['--workers', '1'], environ) == 0
+        new_config = SessionConfig.from_key(NEW_KEY, key_version='2')
+        for line, token in zip(capsys.readouterr().out.splitlines(), tokens):
+            old, new = line.split('\t')
+            assert old == token and new.startswith('2.')
+            assert Session(new, new_config).guesses == Session(token, 
+                SessionConfig.from_key(OLD_KEY)).guesses
+
+    def test_main(self, tmp_path, monkeypatch, capsys):
+        """Check the command line tool, with one and several workers.
+        """
+        tokens = sample_tokens(SessionConfig.from_key(OLD_KEY))
+        path = tmp_path / 'tokens.txt'
+        path.write_text('\n'.join((tokens + ['garbage']) * 3) + '\n')
+        environ = {'HANGMAN_KEY': OLD_KEY, 'HANGMAN_NEW_KEY': NEW_KEY}
+        outputs = []
+        for workers in ('1', '2'):
+            assert main([str(path), '--format', 'compact', '--workers', 
+                workers, '--chunk-size', '2'], environ) == 0
+            out, err = capsys.readouterr()
+            outputs.append(out)
+            assert '9 tokens migrated, 3 invalid' in err
+        assert outputs[0] == outputs[1]
+        lines = [line.split('\t') for line in outputs[0].splitlines()]
+        assert [old for old, _ in lines] == (tokens + ['garbage']) * 3
+        new_config = SessionConfig.from_key(NEW_KEY, token_format='compact')
+        assert Session(lines[2][1], new_config).guesses == ['E', 'T', 
+            'BRIDGE']
+        assert lines[3][1] == ''
+        monkeypatch.setattr(sys, 'stdin', io.StringIO(tokens[0]))
+        assert main([], {'HANGMAN_KEY': OLD_KEY}) == 0
+        assert capsys.readouterr().out == f'{tokens[0]}\t{tokens[0]}\n'
+        assert main([], {}) == 2
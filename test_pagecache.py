@@ -0,0 +1,39 @@
+"""Test all logic in pagecache.py
+"""
+
+from pagecache import PageCache
+
+
+class TestPageCache:
+    """Test the PageCache class in pagecache.py
+    """
+
+    def test_hits_and_misses(self):
+        """Check that lookups are counted.
+        """
+        cache = PageCache(2)
+        assert cache.get('A') is None
+        cache.put('A', '<p>A</p>')
+        assert cache.get('A') == '<p>A</p>'
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 
+            'maxsize': 2}
+
+    def test_lru_eviction(self):
+        """Check that the least recently used page is evicted first.
+        """
+        cache = PageCache(2)
+        cache.put('A', 'a')
+        cache.put('B', 'b')
+        cache.get('A')
+        cache.put('C', 'c')
+        assert len(cache) == 2
+        assert cache.get('B') is None
+        assert cache.get('A') == 'a'
+        assert cache.get('C') == 'c'
+
+    def test_disabled(self):
+        """Check that a cache with no room stores nothing.
+        """
+        cache = PageCache(0)
+        cache.put('A', 'a')
+        assert cache.get('A') is None
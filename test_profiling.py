@@ -0,0 +1,64 @@
+"""Test all logic in profiling.py
+"""
+
+import marshal
+import random
+
+import pytest
+
+from profiling import PROFILE_HEADER, RouteProfiler, profile_token
+
+
+class TestRouteProfiler:
+    """Test the RouteProfiler class in profiling.py
+    """
+
+    def test_should_profile(self):
+        """Check that only session routes are sampled, and that the header 
+        must carry the token for the key.
+        """
+        header = {PROFILE_HEADER: profile_token('KEY')}
+        never = RouteProfiler('KEY', 0.0)
+        assert not never.should_profile('/session/ABC', {})
+        assert never.should_profile('/session/ABC', header)
+        assert not never.should_profile('/session/ABC', 
+            {PROFILE_HEADER: profile_token('OTHER')})
+        assert not never.should_profile('/', header)
+        for value in ['caf\u00e9', '\u2603']:
+            assert not never.should_profile('/session/ABC', 
+                {PROFILE_HEADER: value})
+        always = RouteProfiler('KEY', 1.0)
+        assert always.should_profile('/session/ABC/guesses', {})
+        sampled = RouteProfiler('KEY', 0.25, random.Random(0))
+        count = sum(sampled.should_profile('/session/ABC', {}) for _ in 
+            range(4000))
+        assert 800 < count < 1200
+        with pytest.raises(ValueError):
+            RouteProfiler('KEY', 2.0)
+
+    def test_aggregate(self):
+        """Check that profiles are added up and can be reported, dumped and 
+        reset.
+        """
+        profiler = RouteProfiler('KEY')
+        for _ in range(2):
+            profile = profiler.start()
+            sorted(range(100), key=str)
+            profiler.stop(profile)
+        report = profiler.report()
+        assert report.startswith('2 profiled requests')
+        assert 'sorted' in report
+        stats = marshal.loads(profiler.dump())
+        assert any(name == "<built-in method builtins.sorted>" and 
+            values[0] == 2 for (_, _, name), values in stats.items())
+        profiler.reset()
+        assert profiler.report() == '0 profiled requests\n'
+
+    def test_one_at_a_time(self):
+        """Check that a second request is not profiled while one is.
+        """
+        profiler = RouteProfiler('KEY')
+        profile = profiler.start()
+        assert profiler.start() is None
+        profiler.stop(profile)
+        assert profiler.start() is not None
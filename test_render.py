@@ -0,0 +1,33 @@
+"""Test all logic in render.py
+"""
+
+import itertools
+
+from flask import render_template
+
+from app import create_app
+from render import PageRenderer
+
+
+def test_matches_template():
+    """Check that every page shape renders exactly what the template does, 
+    including values that need escaping.
+    """
+    app = create_app(testing=True)
+    renderer = PageRenderer(app)
+    values = [
+        {'url': '2PCMD0,23T3WTHJV5OYP1', 'errors': '', 
+            'word_display': '_ A _ _', 'guesses': 'A E', 'guesses_left': 8},
+        {'url': 'c<a>&"\'', 'errors': '<b>Oops</b> & "more"', 
+            'word_display': 'B R I D G E', 'guesses': 'BRIDGE <i>', 
+            'guesses_left': 0},
+    ]
+    for value, (victory, defeat, direct_guess), prev_word_count in \
+            itertools.product(values, itertools.product((False, True), 
+            repeat=3), (0, 7, 8)):
+        context = dict(value, victory=victory, defeat=defeat, 
+            prev_word_count=prev_word_count, word_count=9, 
+            direct_guess=direct_guess)
+        with app.test_request_context():
+            expected = render_template('base.html', **context)
+        assert renderer.render(**context) == expected
@@ -0,0 +1,85 @@
+"""Test all logic in server.py
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from session import Session, SessionConfig
+
+
+@pytest.fixture
+def server(tmp_path):
+    env_file = tmp_path / 'hangman.env'
+    env_file.write_text(f"HANGMAN_KEY={os.environ['HANGMAN_KEY']}\n")
+    process = subprocess.Popen([sys.executable, 'server.py', '--port', '0', 
+        '--workers', '2', '--env-file', str(env_file), '--timeout', '1'], 
+        cwd=os.path.dirname(os.path.abspath(__file__)), 
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = process.stdout.readline()
+    port = int(line.split()[2].rsplit(':', 1)[1])
+
+    yield process, port, env_file
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+def get(port, path):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', 
+            timeout=5) as response:
+        return response.status, response.read()
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_serve_reload_and_stop(server):
+    """Check that workers serve the app, survive a reload with a new key, 
+    and stop on SIGTERM.
+    """
+    process, port, env_file = server
+    status, body = get(port, '/')
+    assert status == 200
+    assert b'Guesses left: 8' in body
+
+    new_key = 'NEWKEY' * 10
+    session = Session(config=SessionConfig.from_key(new_key))
+    session.current_word_index = 4
+    session.guesses = ['A']
+    session.encode_url()
+    env_file.write_text(f'HANGMAN_KEY={new_key}\n')
+    process.send_signal(signal.SIGHUP)
+    time.sleep(1.5)
+    for _ in range(5):
+        status, body = get(port, f'/session/{session.get_encoded_url()}')
+        assert status == 200
+        assert b'_ A _ _ _ _ A' in body
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=15) == 0
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs os.fork')
+def test_idle_connections_and_bad_reload(server):
+    """Check that idle connections do not hold the workers, and that a 
+    reload with an unusable setting keeps the running workers.
+    """
+    process, port, env_file = server
+    idle = [socket.create_connection(('127.0.0.1', port)) for _ in range(2)]
+    try:
+        status, body = get(port, '/')
+        assert status == 200
+    finally:
+        for connection in idle:
+            connection.close()
+
+    env_file.write_text(f"HANGMAN_KEY={os.environ['HANGMAN_KEY']}\n"
+        'HANGMAN_PAGE_CACHE_SIZE=many\n')
+    process.send_signal(signal.SIGHUP)
+    time.sleep(1.5)
+    assert process.poll() is None
+    assert get(port, '/')[0] == 200
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=15) == 0
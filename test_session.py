@@ -1,7 +1,108 @@
 """Test all logic in url.py
 """
 
-from session import Session
+import random
+from collections import Counter
+
+import pytest
+
+from session import (ConfigError, Session, SessionConfig, load_config, 
+    parse_key_ring, pick_unplayed_index, split_token)
+from tokens import InvalidToken
+
+
+class TestSessionConfig:
+    """Test the shared configuration in session.py
+    """
+
+    def test_sessions_share_config(self):
+        """Check that sessions reference one configuration instead of 
+        rebuilding the key and word table.
+        """
+        first = Session()
+        second = Session()
+        assert first.config is second.config
+        assert first.word_table is second.word_table
+        assert first.word_table[8] == 'BIFROST'
+        assert first.config.char_index['C'] == 2
+
+    def test_load_config_fails_fast(self):
+        """Check that a missing or invalid key is reported immediately.
+        """
+        with pytest.raises(ConfigError):
+            load_config({})
+        with pytest.raises(ConfigError):
+            load_config({'HANGMAN_KEY': ''})
+        with pytest.raises(ConfigError):
+            load_config({'HANGMAN_KEY': 'abc'})
+
+    def test_config_is_frozen(self):
+        """Check that the configuration cannot be modified.
+        """
+        config = SessionConfig.from_key('KEY')
+        with pytest.raises(AttributeError):
+            config.key = 'OTHER'
+
+    def test_key_ring(self):
+        """Check that the key ring is parsed and validated, and that key 
+        versions are looked up with their expiry times.
+        """
+        assert parse_key_ring('') == []
+        assert parse_key_ring(':OLD; 2:NEWER:1700000000 ') == [
+            ('', 'OLD', None), ('2', 'NEWER', 1700000000.0)]
+        for value in ['1', '1:KEY:soon', '1:KEY:2:3']:
+            with pytest.raises(ConfigError):
+                parse_key_ring(value)
+        for version, key_ring in [('3', [('3', 'OLD', None)]), 
+                ('3', [('1', 'OLD', None), ('1', 'OLD', None)]), 
+                ('3', [('V1', 'OLD', None)]), ('3', [('1', 'old', None)]), 
+                ('x.y', [])]:
+            with pytest.raises(ConfigError):
+                SessionConfig.from_key('KEY', key_version=version, 
+                    key_ring=key_ring)
+        config = SessionConfig.from_key('KEY', key_version='3', key_ring=[
+            ('', 'FIRST', None), ('2', 'SECOND', 1000)])
+        assert config.token_prefix == '3.'
+        assert config.for_version('3') is config
+        assert config.for_version('').key == 'FIRST'
+        assert config.for_version('2', now=999).key == 'SECOND'
+        assert config.for_version('2', now=999).word_table is \
+            config.word_table
+        with pytest.raises(InvalidToken):
+            config.for_version('2', now=1000)
+        with pytest.raises(InvalidToken):
+            config.for_version('4')
+        assert split_token('3.AB-C') == ('3', 'AB-C')
+        assert split_token('AB-C') == ('', 'AB-C')
+        assert split_token('AB-C' * 5 + '.X') == ('', 'AB-C' * 5 + '.X')
+
+
+class TestPickUnplayedIndex:
+    """Test the word selection in session.py
+    """
+
+    def test_uniform(self):
+        """Check that every unplayed index is picked about equally often, 
+        both when few and when most words have been played.
+        """
+        rng = random.Random(0)
+        for played in [{1, 4}, set(range(100)) - {3, 50, 77, 99}]:
+            counts = Counter(pick_unplayed_index(100, played, rng) for _ in 
+                range(20000))
+            unplayed = set(range(100)) - played
+            assert set(counts) == unplayed
+            expected = 20000 / len(unplayed)
+            chi_squared = sum((count - expected) ** 2 / expected for count in 
+                counts.values())
+            degrees = len(unplayed) - 1
+            assert chi_squared < degrees + 5 * (2 * degrees) ** 0.5
+
+    def test_exhausted(self):
+        """Check that None is returned once every word has been played.
+        """
+        assert pick_unplayed_index(3, [0, 1, 2]) is None
+        assert pick_unplayed_index(3, [2, 0, 5]) == 1
+        assert pick_unplayed_index(0, []) is None
 
 
 class TestSession:
@@ -46,6 +147,25 @@ class TestSession:
         assert session.current_word != previous_word
         assert session.guesses == []
 
+    def test_get_new_word_exhausted(self):
+        """Check that an error is added when every word has been played.
+        """
+        session = Session()
+        session.previous_word_indexes = [0, 1, 2, 3, 4, 5, 6, 7]
+        session.current_word_index = 8
+        session.current_word = 'BIFROST'
+        session.guesses = ['BIFROST']
+        session.get_new_word()
+        assert session.errors == ['You have played every word in this session.']
+        assert session.current_word_index == 8
+        assert session.previous_word_indexes == [0, 1, 2, 3, 4, 5, 6, 7]
+        assert session.guesses == ['BIFROST']
+        session = Session()
+        session.previous_word_indexes = [1, 2, 3, 4, 5, 6, 7, 8]
+        session.current_word_index = 0
+        session.get_new_word()
+        assert session.has_errors()
+
     def test_add_guess(self):
         """Check that both letter and word guesses are correctly tracked, 
         and that only one word guess per game is enforced.
@@ -71,6 +191,11 @@ class TestSession:
         assert session.letters_guessed == ['E', 'S', 'T', 'A']
         assert session.word_guessed == 'BRIDGE'
         assert session.errors == ['You have already guessed a word in this game.']
+        for guess in ['', '!', 'AB CD', '\u00e9', 'A-B', 'A,B']:
+            session.add_guess(guess)
+        assert session.guesses == ['E', 'S', 'T', 'A', 'BRIDGE']
+        assert session.errors[1:] == [
+            'Guesses may only contain the letters A-Z and the digits 0-9.'] * 6
 
     def test_update_word_display(self):
         """Check that the word display successfully updates in response 
@@ -115,6 +240,8 @@ class TestSession:
         assert session.guesses == ['E', 'TACONY']
         session.undo()
         assert session.guesses == ['E']
+        assert session.word_guessed == None
+        assert session.letters_guessed == ['E']
         session = Session()
         session.previous_word_indexes = [3, 5]
         session.current_word_index = 1
@@ -244,4 +371,160 @@ class TestSession:
         session.check_game_end()
         assert session.guesses_left == 0
         assert session.defeat == True
-        assert session.victory == False
\ No newline at end of file
+        assert session.victory == False
+
+    def test_incremental_urls(self):
+        """Check that adding and removing a guess at the end of the URL 
+        gives the same URL as a full decode and encode.
+        """
+        session = Session()
+        session.previous_word_indexes = [2, 5]
+        session.current_word_index = 7
+        session.encode_url()
+        start = session.encoded_url
+        assert Session.url_without_last_guess(start) is None
+        for guess in ['e', 'T', 'A', '7']:
+            before = session.encoded_url
+            session.add_guess(guess)
+            session.encode_url()
+            assert Session.url_with_guess(before, guess) == session.encoded_url
+            assert Session.url_without_last_guess(session.encoded_url) == \
+                before
+        before = session.encoded_url
+        assert Session.url_with_guess(before, 'BRIDGE') is None
+        session.add_guess('BRIDGE')
+        session.encode_url()
+        assert Session.url_without_last_guess(session.encoded_url) == before
+        # Malformed URLs are left to the full decode, which rejects them.
+        for data in ['25-7', '25-99-E', '2X-7-E', '25-7-E-T', '25-7-E-']:
+            malformed = session.codec.encode(data)
+            if not data.endswith('T'):
+                # Adding a guess only checks the word indexes and the last 
+                # character, so as not to read the other guesses.
+                assert Session.url_with_guess(malformed, 'A') is None
+            assert Session.url_without_last_guess(malformed) is None
+            with pytest.raises(InvalidToken):
+                Session(malformed).guesses
+
+    def test_lazy_guesses(self):
+        """Check that the guesses of a legacy URL are only decoded when 
+        read, and that undo and encoding work without decoding them.
+        """
+        session = Session()
+        session.previous_word_indexes = [2, 5]
+        session.current_word_index = 7
+        session.guesses = ['E', 'T', 'BRIDGE', 'A']
+        session.encode_url()
+        full = session.encoded_url
+        session.guesses = ['E', 'T', 'BRIDGE']
+        session.encode_url()
+        undone = session.encoded_url
+        session = Session(full)
+        session.undo()
+        session.encode_url()
+        assert session.encoded_url == undone
+        assert session.guesses == ['E', 'T', 'BRIDGE']
+        assert session.word_guessed == 'BRIDGE'
+        session = Session(full[:-3] + 'aaa')
+        assert session.current_word == 'NARROWS'
+        session.get_new_word()
+        session.encode_url()
+        assert Session(session.encoded_url).guesses == []
+        with pytest.raises(InvalidToken):
+            Session(full[:-3] + 'aaa').guesses
+        with pytest.raises(InvalidToken):
+            Session(session.codec.encode('-1-A-B')).guesses
+
+    def test_long_sessions(self):
+        """Check that sessions far longer than the key encode, decode and 
+        change incrementally, with thousands of guesses and words.
+        """
+        config = SessionConfig.from_key('SHORTKEY')
+        rng = random.Random(0)
+        session = Session(config=config)
+        session.previous_word_indexes = [rng.randrange(9) for _ in 
+            range(2000)]
+        session.current_word_index = 7
+        session.guesses = [rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+            for _ in range(5000)] + ['BRIDGE']
+        session.encode_url()
+        url = session.encoded_url
+        assert len(url) > 12000
+        decoded = Session(url, config)
+        assert decoded.previous_word_indexes == session.previous_word_indexes
+        assert decoded.guesses == session.guesses
+        assert decoded.word_guessed == 'BRIDGE'
+        decoded.undo()
+        decoded.encode_url()
+        assert Session.url_without_last_guess(url, config) == \
+            decoded.encoded_url
+        assert Session(decoded.encoded_url, config).guesses == \
+            session.guesses[:-1]
+        with_guess = Session.url_with_guess(decoded.encoded_url, 'E', config)
+        decoded.add_guess('E')
+        decoded.encode_url()
+        assert with_guess == decoded.encoded_url
+        for _ in range(3000):
+            guess = rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+            url = Session.url_with_guess(url, guess, config)
+        assert len(Session(url, config).guesses) == 8001
+
+    def test_key_ring(self):
+        """Check that tokens under older keys in the key ring are decoded 
+        and encoded again with the current key and its version.
+        """
+        first = SessionConfig.from_key('FIRSTKEY0123456789,-' * 3)
+        second = SessionConfig.from_key('SECONDKEY9876543210-' * 3, 
+            key_version='2')
+        for token_format in ('legacy', 'compact', 'sealed'):
+            config = SessionConfig.from_key('THIRDKEY-,0123456789' * 3, 
+                token_format=token_format, key_version='3', key_ring=[
+                ('', first.key, None), ('2', second.key, None)])
+            for old_config in (first, second):
+                session = Session(config=old_config)
+                session.previous_word_indexes = [2, 5]
+                session.current_word_index = 7
+                session.guesses = ['E', 'T', 'BRIDGE']
+                session.encode_url()
+                assert session.encoded_url.startswith(
+                    old_config.token_prefix)
+                session = Session(session.encoded_url, config)
+                assert session.guesses == ['E', 'T', 'BRIDGE']
+                session.undo()
+                session.encode_url()
+                assert session.encoded_url.startswith('3.')
+                session = Session(session.encoded_url, config)
+                assert (session.previous_word_indexes, 
+                    session.current_word_index, session.guesses) == (
+                    [2, 5], 7, ['E', 'T'])
+        with pytest.raises(InvalidToken):
+            Session('4.' + session.encoded_url[2:], config)
+        with pytest.raises(InvalidToken):
+            Session(session.encoded_url[2:], SessionConfig.from_key(
+                config.key, key_version='3'))
+
+    def test_key_ring_incremental_urls(self):
+        """Check that the incremental URL changes keep the key version, 
+        and leave URLs under older keys to a full decode.
+        """
+        old_config = SessionConfig.from_key('OLDKEY0123456789-,' * 3, 
+            key_version='1')
+        config = SessionConfig.from_key('NEWKEY9876543210,-' * 3, 
+            key_version='2', key_ring=[('1', old_config.key, None)])
+        for session_config in (old_config, config):
+            session = Session(config=session_config)
+            session.current_word_index = 7
+            session.guesses = ['E']
+            session.encode_url()
+            url = session.encoded_url
+            with_guess = Session.url_with_guess(url, 'T', config)
+            without_guess = Session.url_without_last_guess(url, config)
+            if session_config is old_config:
+                assert with_guess is None and without_guess is None
+                continue
+            session.add_guess('T')
+            session.encode_url()
+            assert with_guess == session.encoded_url
+            assert Session.url_without_last_guess(with_guess, config) == url
+            assert without_guess.startswith('2.')
+            assert Session(without_guess, config).guesses == []
@@ -0,0 +1,70 @@
+"""Test all logic in simulate.py
+"""
+
+import io
+import random
+
+from session import WORD_TABLE, Session, SessionConfig
+from simulate import (DEFEAT, IN_PROGRESS, VICTORY, play, play_line, 
+    read_results, simulate_stream)
+
+
+def random_game(rng):
+    """Return a random word and guess sequence, with the occasional word 
+    guess.
+    """
+    word = rng.choice(WORD_TABLE)
+    guesses = []
+    for _ in range(rng.randrange(15)):
+        if rng.random() < 0.1:
+            guesses.append(rng.choice(WORD_TABLE))
+        elif rng.random() < 0.02:
+            guesses.append(rng.choice(['', '7', 'é']))
+        else:
+            guesses.append(rng.choice('abcdefghijklmnopqrstuvwxyz'))
+    return word, guesses
+
+
+class TestSimulate:
+    """Test the simulation functions in simulate.py
+    """
+
+    def test_matches_session(self):
+        """Check that simulated games end the same way as sessions.
+        """
+        config = SessionConfig.from_key('KEY')
+        rng = random.Random(0)
+        for _ in range(2000):
+            word, guesses = random_game(rng)
+            session = Session(config=config)
+            session.current_word = word
+            for guess in guesses:
+                if guess.isascii() and guess.isalnum():
+                    session.add_guess(guess)
+                else:
+                    # add_guess refuses these, but like the guesses of a 
+                    # decoded URL a game line can still hold them.
+                    session.guesses.append(guess.upper())
+                    session.split_guesses()
+            session.check_game_end()
+            status = (VICTORY if session.victory else DEFEAT if 
+                session.defeat else IN_PROGRESS)
+            assert play(word, guesses) == (status, session.guesses_left)
+            assert play_line(f"{word} {','.join(guesses)}") == (status, 
+                session.guesses_left)
+
+    def test_results_file(self, tmp_path):
+        """Check that results are written in order, with one or more 
+        workers, and read back.
+        """
+        lines = ['VECCHIO E,T,A,O', '', 'GOLDEN golden', 
+            'BRIDGE Q,W,Z,X,V,K,J,M,P', 'TACONY Q,TACONY'] * 5
+        expected = [(IN_PROGRESS, 6), (VICTORY, 8), (DEFEAT, -1), 
+            (VICTORY, 7)] * 5
+        for workers in (1, 2):
+            path = tmp_path / f'results{workers}.hsr'
+            with open(path, 'wb') as output:
+                games = simulate_stream(io.StringIO('\n'.join(lines)), 
+                    output, workers, chunk_size=3)
+            assert games == 20
+            assert list(read_results(path)) == expected
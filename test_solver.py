@@ -0,0 +1,94 @@
+"""Test all logic in solver.py
+"""
+
+import random
+
+import solver
+from session import WORD_TABLE, Session, SessionConfig
+from solver import MAX_WRONG_GUESSES, Solver
+
+
+WORDS = ['BRIDGE', 'FRIDGE', 'GOLDEN', 'TACONY', 'BRIDGES', 'VECCHIO']
+
+
+class TestSolver:
+    """Test the Solver class in solver.py
+    """
+
+    def test_candidates(self):
+        """Check that candidates match the display and avoid wrong guesses.
+        """
+        words_solver = Solver(WORDS)
+        assert words_solver.words('______') == ['BRIDGE', 'FRIDGE', 
+            'GOLDEN', 'TACONY']
+        assert words_solver.words('_RID_E') == ['BRIDGE', 'FRIDGE']
+        assert words_solver.words('_RID_E', frozenset('B')) == ['FRIDGE']
+        assert words_solver.words('______', frozenset(['BRIDGE', 'Y'])) == \
+            ['FRIDGE', 'GOLDEN']
+        # A found letter cannot also be at an unknown position.
+        assert words_solver.words('____E_') == ['GOLDEN']
+        assert words_solver.count('________') == 0
+
+    def test_best_guess(self):
+        """Check that the chosen letter splits the candidates best.
+        """
+        words_solver = Solver(WORDS)
+        assert words_solver.best_guess('_RID_E', frozenset()) in ('B', 'F')
+        assert words_solver.best_guess('______', frozenset()) == 'E'
+        assert words_solver.best_guess('______', frozenset('BCDEFGILNORTY')) \
+            is None
+
+    def test_large_and_small_paths_agree(self, monkeypatch):
+        """Check that splitting bitsets and splitting words one by one pick 
+        the same letters.
+        """
+        rng = random.Random(0)
+        words = sorted({''.join(rng.choice('EEETTAAONIRSHDLU') for _ in 
+            range(6)) for _ in range(3000)})
+        states = [('______', frozenset()), ('E_____', frozenset('T')), 
+            ('__A___', frozenset('ES'))]
+        monkeypatch.setattr(solver, 'SMALL_CANDIDATE_COUNT', 0)
+        by_bitset = [Solver(words).best_guess(*state) for state in states]
+        monkeypatch.setattr(solver, 'SMALL_CANDIDATE_COUNT', 10 ** 6)
+        by_word = [Solver(words).best_guess(*state) for state in states]
+        assert by_bitset == by_word
+
+    def test_cache_size(self):
+        """Check that fewer game states are memoized for larger 
+        dictionaries.
+        """
+        assert Solver(WORDS).candidates.cache_info().maxsize == \
+            solver.MAX_CACHE_SIZE
+        assert Solver(WORDS, 10).best_guess.cache_info().maxsize == 10
+        sizes = [solver.cache_size_for(group_size) for group_size in [0, 
+            10 ** 5, 10 ** 6, 10 ** 8]]
+        assert sizes[0] == solver.MAX_CACHE_SIZE
+        assert sizes == sorted(sizes, reverse=True)
+        assert sizes[1] * (10 ** 5 // 8) <= solver.CACHE_BYTES
+        assert sizes[3] == solver.MIN_CACHE_SIZE
+
+    def test_hint(self):
+        """Check the hint for a session in progress and a finished one.
+        """
+        config = SessionConfig.from_key('KEY')
+        words_solver = Solver(WORD_TABLE)
+        session = Session(config=config)
+        session.current_word_index = 6
+        session.current_word = 'BRIDGE'
+        assert words_solver.hint(session) == {'letter': 'E', 
+            'candidates': 3}
+        session.add_guess('E')
+        assert words_solver.hint(session) == {'letter': 'B', 
+            'candidates': 1, 'word': 'BRIDGE'}
+        session.add_guess('BRIDGE')
+        assert words_solver.hint(session)['letter'] is None
+
+    def test_score(self):
+        """Check that every word of the built-in table is solved, and that 
+        a word with many look-alikes costs wrong guesses.
+        """
+        words_solver = Solver(WORD_TABLE)
+        assert all(words_solver.score(word) < MAX_WRONG_GUESSES for word in 
+            WORD_TABLE)
+        words = ['B' + letter + 'LL' for letter in 'AEIOU']
+        assert max(Solver(words).score(word) for word in words) >= 3
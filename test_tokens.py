@@ -0,0 +1,137 @@
+"""Test all logic in tokens.py
+"""
+
+import os
+
+import pytest
+
+from codec import Keystream
+from session import Session, SessionConfig
+from tokens import (COMPACT_PREFIX, SEALED_PREFIX, InvalidToken, 
+    TokenSealer, decode_compact, decode_varint, encode_compact, 
+    encode_varint, pack_state, unpack_state)
+
+
+class TestCompactTokens:
+    """Test the compact token format in tokens.py
+    """
+
+    def test_varint_round_trip(self):
+        """Check that small and large indexes survive encoding.
+        """
+        for value in [0, 1, 127, 128, 300, 16383, 16384, 10 ** 6]:
+            out = bytearray()
+            encode_varint(value, out)
+            assert decode_varint(bytes(out), 0) == (value, len(out))
+        assert len(out) == 3
+
+    def test_pack_unpack(self):
+        """Check that letters, digits, word guesses and empty guesses are 
+        restored.
+        """
+        state = ([2, 5, 1000], 70000, ['E', 'T', '7', 'BRIDGE', 'A1B', 'I'])
+        assert unpack_state(pack_state(*state)) == state
+        for guesses in [[''], ['', 'Q'], ['E', '', 'BRIDGE', '', '']]:
+            assert unpack_state(pack_state([1], 2, guesses)) == ([1], 2, 
+                guesses)
+        assert unpack_state(pack_state([], 0, [])) == ([], 0, [])
+
+    def test_invalid_guess(self):
+        """Check that characters outside the alphabet are rejected.
+        """
+        with pytest.raises(ValueError):
+            pack_state([], 0, ['?'])
+
+    def test_round_trip_and_prefix(self):
+        """Check that tokens are prefixed, URL safe, and decode back.
+        """
+        keystream = Keystream('KEY', 'compact')
+        token = encode_compact(keystream, [2, 5], 7, ['E', 'T', 'BRIDGE'])
+        assert token.startswith(COMPACT_PREFIX)
+        assert set(token[1:]) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghij'
+            'klmnopqrstuvwxyz0123456789-_')
+        assert decode_compact(keystream, token) == ([2, 5], 7, 
+            ['E', 'T', 'BRIDGE'])
+        other = Keystream('OTHER', 'compact')
+        assert encode_compact(other, [2, 5], 7, ['E']) != encode_compact(
+            keystream, [2, 5], 7, ['E'])
+
+    def test_session_compact_format(self):
+        """Check that compact URLs are shorter than legacy URLs, can hold 
+        more data than the key, and that legacy URLs are still accepted.
+        """
+        config = SessionConfig.from_key(os.environ['HANGMAN_KEY'], 
+            token_format='compact')
+        legacy = Session()
+        legacy.previous_word_indexes = [2, 5]
+        legacy.current_word_index = 7
+        legacy.guesses = ['E', 'T', 'A', 'O', 'BRIDGE', 'I']
+        legacy.encode_url()
+        session = Session(legacy.encoded_url, config)
+        assert session.current_word == 'NARROWS'
+        assert session.word_guessed == 'BRIDGE'
+        session.encode_url()
+        assert session.encoded_url.startswith(COMPACT_PREFIX)
+        assert len(session.encoded_url) < len(legacy.encoded_url)
+
+        session.guesses = ['E', 'T'] * (len(config.key) * 2)
+        session.encode_url()
+        decoded = Session(session.encoded_url, config)
+        assert decoded.guesses == session.guesses
+        assert decoded.previous_word_indexes == [2, 5]
+
+
+class TestSealedTokens:
+    """Test the TokenSealer class in tokens.py
+    """
+
+    def test_seal_open(self):
+        """Check that sealed tokens round trip for any payload length.
+        """
+        sealer = TokenSealer('KEY')
+        for guesses in [[], ['E'], ['E', 'T', 'BRIDGE'], ['A'] * 500, 
+                [''], ['', 'Q', '7', 'A1B', '', 'BRIDGE']]:
+            token = sealer.seal([2, 5], 7, guesses)
+            assert token.startswith(SEALED_PREFIX)
+            assert sealer.open(token) == ([2, 5], 7, guesses)
+        token = sealer.seal([2, 5, 1000], 70000, ['E'])
+        assert sealer.open(token) == ([2, 5, 1000], 70000, ['E'])
+        for guess in ['?', 'e', '(E)', 'É']:
+            with pytest.raises(ValueError):
+                sealer.seal([], 0, [guess])
+
+    def test_rejects_tampering(self):
+        """Check that modified, truncated, foreign and malformed tokens are 
+        rejected.
+        """
+        sealer = TokenSealer('KEY')
+        token = sealer.seal([2, 5], 7, ['E', 'T'])
+        flipped = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        for bad in [flipped, token[:-2], 's', 's!!!', 
+                TokenSealer('OTHER').seal([2, 5], 7, ['E', 'T'])]:
+            with pytest.raises(InvalidToken):
+                sealer.open(bad)
+        # Only the URL-safe alphabet is accepted, so each state has one 
+        # token.
+        token = sealer.seal([2, 5], 7, ['E', 'T'] * 20)
+        assert sealer.open(token)
+        assert '-' in token and '_' in token
+        for bad in [token.replace('-', '+'), token.replace('_', '/')]:
+            with pytest.raises(InvalidToken):
+                sealer.open(bad)
+
+    def test_tag_checked_first(self):
+        """Check that a token is not decrypted unless its tag matches.
+        """
+        sealer = TokenSealer('KEY')
+        token = sealer.seal([2, 5], 7, ['E', 'T'])
+        sealer._crypt = None
+        with pytest.raises(InvalidToken):
+            sealer.open(token[:-1] + ('A' if token[-1] != 'A' else 'B'))
+
+    def test_session_rejects_invalid_urls(self):
+        """Check that every undecodable URL surfaces as InvalidToken.
+        """
+        for url in ['s' + 'A' * 30, 'c!', 'abc', 'A' * 500]:
+            with pytest.raises(InvalidToken):
+                Session(url)
@@ -0,0 +1,97 @@
+"""Test all logic in wordstore.py
+"""
+
+import os
+
+import pytest
+
+from session import ConfigError, Session, SessionConfig, load_config
+from wordstore import WordStore, pack_words, write_word_store
+
+
+class TestWordStore:
+    """Test the WordStore class in wordstore.py
+    """
+
+    def test_lookup(self):
+        """Check that words are returned by index, in order.
+        """
+        store = WordStore.from_words(['finesse', 'WHITMAN', 'TACONY\n'])
+        assert len(store) == 3
+        assert store[0] == 'FINESSE'
+        assert store[2] == 'TACONY'
+        assert store[-1] == 'TACONY'
+        assert list(store) == ['FINESSE', 'WHITMAN', 'TACONY']
+        with pytest.raises(IndexError):
+            store[3]
+        assert store.digest() == WordStore.from_words(['FINESSE', 
+            'WHITMAN', 'TACONY']).digest()
+        assert store.digest() != WordStore.from_words(['FINESSE', 
+            'WHITMAN', 'TACONE']).digest()
+
+    def test_open_file(self, tmp_path):
+        """Check that a store written to disk is read back through mmap.
+        """
+        path = tmp_path / 'words.hws'
+        words = ['W' * (1 + i % 7) + chr(65 + i % 26) for i in range(1000)]
+        write_word_store(path, words)
+        store = WordStore.open(path)
+        assert len(store) == 1000
+        assert store[0] == words[0]
+        assert store[999] == words[999]
+
+    def test_invalid_input(self):
+        """Check that bad words and bad files are rejected.
+        """
+        with pytest.raises(ValueError):
+            pack_words(['ABC', 'NOT A WORD'])
+        with pytest.raises(ValueError):
+            WordStore(b'XXXX\x00\x00\x00\x00')
+        packed = pack_words(['FINESSE', 'WHITMAN'])
+        for truncated in [b'', b'HWS1', b'HWS1\xff\xff\x00\x00', 
+                packed[:12], packed[:-1]]:
+            with pytest.raises(ValueError):
+                WordStore(truncated)
+        assert list(WordStore(packed)) == ['FINESSE', 'WHITMAN']
+
+    def test_truncated_file(self, tmp_path):
+        """Check that a truncated HANGMAN_WORDS file is a configuration 
+        error, so a reload keeps the running workers.
+        """
+        for data in [b'', b'HWS', b'HWS1\xff\xff\x00\x00']:
+            path = tmp_path / 'words.hws'
+            path.write_bytes(data)
+            with pytest.raises(ConfigError):
+                load_config({'HANGMAN_KEY': 'KEY', 'HANGMAN_WORDS': 
+                    str(path)})
+
+    def test_session_with_large_store(self):
+        """Check that sessions can use multi-digit word indexes.
+        """
+        words = [''.join(chr(65 + (i // 26 ** n) % 26) for n in range(4)) 
+            for i in range(500)]
+        config = SessionConfig.from_key(os.environ['HANGMAN_KEY'], 
+            WordStore.from_words(words))
+        session = Session(config=config)
+        session.previous_word_indexes = [12]
+        session.current_word_index = 345
+        session.encode_url()
+        decoded = Session(session.encoded_url, config)
+        assert decoded.previous_word_indexes == [12]
+        assert decoded.current_word == words[345]
+        session.previous_word_indexes = [499, 3, 120]
+        session.encode_url()
+        assert Session(session.encoded_url, config).previous_word_indexes \
+            == [499, 3, 120]
+
+    def test_load_config_from_file(self, tmp_path):
+        """Check that HANGMAN_WORDS selects a word store file.
+        """
+        path = tmp_path / 'words.hws'
+        write_word_store(path, ['ALPHA', 'BRAVO'])
+        config = load_config({'HANGMAN_KEY': os.environ['HANGMAN_KEY'], 
+            'HANGMAN_WORDS': str(path)})
+        try:
+            assert list(config.word_table) == ['ALPHA', 'BRAVO']
+        finally:
+            load_config()
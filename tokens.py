@@ -0,0 +1,291 @@
+"""Binary session token formats.
+
+Compact tokens serialize the session state to bytes instead of text:
+  * word indexes are varints (the previous word count first, then the
+    previous indexes, then the current index)
+  * guesses are a stream of 5-bit codes, where a letter is one code, a
+    digit is an escape code followed by its value, a word guess is its
+    letters wrapped in a pair of word markers, and an empty guess (which
+    a legacy URL can hold, and which counts as a wrong guess) has a code
+    of its own
+The bytes are XORed with a keystream derived from HANGMAN_KEY and
+base64url encoded behind a one-character version prefix. Legacy tokens
+only use upper case letters, digits, '-' and ',', so the lower case
+prefix can never be confused with one.
+
+Sealed tokens start with the same varint word indexes, followed by the
+guesses as text: a single character guess is itself, and a word or
+empty guess is wrapped in parentheses. The tag already guarantees the
+text is well formed, so this skips the 5-bit unpacking. The bytes are
+XORed with a keystream derived from HANGMAN_KEY and authenticated with a
+keyed BLAKE2s tag over the ciphertext (encrypt-then-MAC). The tag is the
+first thing checked, so tampered or malformed tokens are rejected
+without decrypting or parsing anything.
+"""
+
+import base64
+import binascii
+import hmac
+from hashlib import blake2s, sha256
+
+from codec import Keystream, xor_bytes
+
+
+COMPACT_PREFIX = 'c'
+SEALED_PREFIX = 's'
+TAG_SIZE = 12
+
+_WORD_CODE = 26
+_DIGIT_CODE = 27
+_EMPTY_CODE = 28
+_END_CODE = 31
+
+# Maps the URL-safe base64 alphabet to the standard one. '+' and '/' map 
+# to a character that is in neither, so strict decoding rejects them.
+_FROM_URLSAFE = bytes.maketrans(b'-_+/', b'+/!!')
+
+
+class InvalidToken(ValueError):
+    """Raised when a session token cannot be decoded.
+    """
+
+
+def encode_varint(value, out):
+    """Append an unsigned LEB128 varint to a bytearray.
+    """
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, position):
+    """Read a varint starting at position, returning (value, new position).
+    """
+    value = 0
+    shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError('Truncated varint in session token.')
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+
+def pack_header(previous_word_indexes, current_word_index, out):
+    """Append the word indexes as varints to a bytearray.
+    """
+    encode_varint(len(previous_word_indexes), out)
+    for word_index in previous_word_indexes:
+        encode_varint(word_index, out)
+    encode_varint(current_word_index, out)
+
+
+def unpack_header(data):
+    """Read the word indexes written by pack_header, returning (previous 
+    word indexes, current word index, position of the next byte).
+    """
+    count = data[0] if data else 0
+    position = count + 2
+    header = data[1:position]
+    if len(header) == count + 1 and max(header) < 0x80:
+        # Every varint is one byte, as in any small dictionary.
+        return list(header[:-1]), header[-1], position
+    count, position = decode_varint(data, 0)
+    previous_word_indexes = []
+    for _ in range(count):
+        word_index, position = decode_varint(data, position)
+        previous_word_indexes.append(word_index)
+    current_word_index, position = decode_varint(data, position)
+    return previous_word_indexes, current_word_index, position
+
+
+def _char_codes(text):
+    codes = []
+    for char in text:
+        if 'A' <= char <= 'Z':
+            codes.append(ord(char) - 65)
+        elif '0' <= char <= '9':
+            codes.append(_DIGIT_CODE)
+            codes.append(ord(char) - 48)
+        else:
+            raise ValueError(f'{char!r} cannot be stored in a session token.')
+    return codes
+
+
+def pack_state(previous_word_indexes, current_word_index, guesses):
+    """Serialize the session state to bytes.
+    """
+    out = bytearray()
+    pack_header(previous_word_indexes, current_word_index, out)
+
+    codes = []
+    for guess in guesses:
+        if len(guess) > 1:
+            codes.append(_WORD_CODE)
+            codes.extend(_char_codes(guess))
+            codes.append(_WORD_CODE)
+        elif not guess:
+            codes.append(_EMPTY_CODE)
+        else:
+            codes.extend(_char_codes(guess))
+    bits = 0
+    for code in codes:
+        bits = (bits << 5) | code
+    bit_count = 5 * len(codes)
+    padding = -bit_count % 8
+    bits = (bits << padding) | ((1 << padding) - 1)
+    out += bits.to_bytes((bit_count + padding) // 8, 'big')
+    return bytes(out)
+
+
+def unpack_state(data):
+    """Parse bytes produced by pack_state, returning (previous word
+    indexes, current word index, guesses).
+    """
+    previous_word_indexes, current_word_index, position = unpack_header(
+        data)
+
+    bit_count = 8 * (len(data) - position)
+    bits = int.from_bytes(data[position:], 'big')
+    guesses = []
+    word = None
+    digit = False
+    for shift in range(bit_count - 5, -1, -5):
+        code = (bits >> shift) & 31
+        if code == _END_CODE:
+            break
+        if digit:
+            if code > 9:
+                raise ValueError('Invalid digit in session token.')
+            char = chr(48 + code)
+            digit = False
+        elif code == _DIGIT_CODE:
+            digit = True
+            continue
+        elif code == _EMPTY_CODE and word is None:
+            guesses.append('')
+            continue
+        elif code == _WORD_CODE:
+            if word is None:
+                word = []
+            else:
+                guesses.append(''.join(word))
+                word = None
+            continue
+        elif code < 26:
+            char = chr(65 + code)
+        else:
+            raise ValueError('Invalid guess code in session token.')
+        if word is None:
+            guesses.append(char)
+        else:
+            word.append(char)
+    if word is not None or digit:
+        raise ValueError('Truncated guess in session token.')
+    return previous_word_indexes, current_word_index, guesses
+
+
+def encode_compact(keystream, previous_word_indexes, current_word_index,
+        guesses):
+    """Build a compact token, masking the packed state with the keystream.
+    """
+    data = pack_state(previous_word_indexes, current_word_index, guesses)
+    masked = xor_bytes(data, keystream.take(len(data)))
+    return COMPACT_PREFIX + base64.urlsafe_b64encode(masked).rstrip(
+        b'=').decode('ascii')
+
+
+def decode_compact(keystream, token):
+    """Reverse encode_compact, returning the same tuple as unpack_state.
+    """
+    body = token[len(COMPACT_PREFIX):]
+    masked = base64.urlsafe_b64decode(body + '=' * (-len(body) % 4))
+    return unpack_state(xor_bytes(masked, keystream.take(len(masked))))
+
+
+def _guess_text(guesses):
+    parts = []
+    for guess in guesses:
+        if guess and not (guess.isascii() and guess.isalnum() and (
+                guess.isupper() or guess.isdigit())):
+            raise ValueError(f'{guess!r} cannot be stored in a session token.')
+        parts.append(guess if len(guess) == 1 else f'({guess})')
+    return ''.join(parts)
+
+
+def _split_guesses(text):
+    if text.isalnum():
+        # Only single character guesses, the usual case.
+        return list(text)
+    guesses = []
+    position = 0
+    while position < len(text):
+        if text[position] == '(':
+            end = text.index(')', position)
+            guesses.append(text[position + 1:end])
+            position = end + 1
+        else:
+            guesses.append(text[position])
+            position += 1
+    return guesses
+
+
+class TokenSealer:
+    """Seals and opens authenticated tokens for one key.
+    """
+    def __init__(self, key):
+        self._mac = blake2s(key=sha256(b'mac:' + key.encode()).digest(), 
+            digest_size=TAG_SIZE)
+        self._keystream = Keystream(key, 'seal')
+        # The start of the keystream as an integer, by token length. Only 
+        # lengths of tokens that were sealed or verified are added.
+        self._streams = {}
+
+    def _tag(self, ciphertext):
+        mac = self._mac.copy()
+        mac.update(ciphertext)
+        return mac.digest()
+
+    def _crypt(self, data):
+        stream = self._streams.get(len(data))
+        if stream is None:
+            stream = int.from_bytes(self._keystream.take(len(data)), 'big')
+            self._streams[len(data)] = stream
+        return (int.from_bytes(data, 'big') ^ stream).to_bytes(len(data), 
+            'big')
+
+    def seal(self, previous_word_indexes, current_word_index, guesses):
+        """Build a sealed token for the session state.
+        """
+        out = bytearray()
+        pack_header(previous_word_indexes, current_word_index, out)
+        out += _guess_text(guesses).encode('ascii')
+        ciphertext = self._crypt(out)
+        return SEALED_PREFIX + base64.urlsafe_b64encode(self._tag(ciphertext) 
+            + ciphertext).rstrip(b'=').decode('ascii')
+
+    def open(self, token):
+        """Verify a sealed token and return the same tuple as 
+        unpack_state. Raises InvalidToken if the token was not produced 
+        by seal with this key.
+        """
+        body = token[len(SEALED_PREFIX):]
+        try:
+            raw = binascii.a2b_base64((body + '=' * (-len(body) % 4)).encode(
+                'ascii').translate(_FROM_URLSAFE), strict_mode=True)
+        except ValueError:
+            raise InvalidToken('Session token is not valid base64.')
+        if len(raw) <= TAG_SIZE:
+            raise InvalidToken('Session token is too short.')
+        ciphertext = raw[TAG_SIZE:]
+        if not hmac.compare_digest(raw[:TAG_SIZE], self._tag(ciphertext)):
+            raise InvalidToken('Session token failed verification.')
+        data = self._crypt(ciphertext)
+        previous_word_indexes, current_word_index, position = unpack_header(
+            data)
+        return previous_word_indexes, current_word_index, _split_guesses(
+            data[position:].decode('ascii'))
@@ -0,0 +1,112 @@
+"""Indexed word storage for large dictionaries.
+
+A word store file holds every word of a dictionary in a form that can be
+used without loading it:
+  * the magic bytes b'HWS1'
+  * the word count, as a little-endian uint32
+  * count + 1 little-endian uint32 offsets, where word i is the bytes
+    between offsets i and i + 1 of the packed area
+  * the packed area, every word in upper case ASCII with no separators
+Stores are opened through mmap, so worker processes share the same pages
+and looking up a word by index only reads its two offsets and its bytes.
+
+Build a store from a text file with one word per line:
+
+    python wordstore.py words.txt words.hws
+"""
+
+import mmap
+import struct
+import sys
+from hashlib import sha256
+
+
+MAGIC = b'HWS1'
+_HEADER = struct.Struct('<4sI')
+_OFFSETS = struct.Struct('<2I')
+
+
+class WordStore:
+    """A read-only sequence of words backed by a word store buffer.
+    """
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise ValueError('Not a word store file.')
+        magic, count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a word store file.')
+        words_start = _HEADER.size + 4 * (count + 1)
+        # pack_words writes increasing offsets, so checking the last one 
+        # against the size of the packed area covers every word.
+        if len(buffer) < words_start or words_start + struct.unpack_from(
+                '<I', buffer, words_start - 4)[0] > len(buffer):
+            raise ValueError('The word store file is truncated.')
+        self._buffer = buffer
+        self._count = count
+        self._words_start = words_start
+
+    @classmethod
+    def open(cls, path):
+        """Open a word store file through a shared read-only mmap.
+        """
+        with open(path, 'rb') as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_words(cls, words):
+        """Build an in-memory store from a sequence of words.
+        """
+        return cls(pack_words(words))
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('word index out of range')
+        start, end = _OFFSETS.unpack_from(self._buffer,
+            _HEADER.size + 4 * index)
+        start += self._words_start
+        return self._buffer[start:end + self._words_start].decode('ascii')
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def digest(self):
+        """Return a SHA-256 digest of the store, which changes whenever 
+        any of its words do.
+        """
+        return sha256(self._buffer).digest()
+
+
+def pack_words(words):
+    """Serialize words to the word store format.
+    """
+    packed = []
+    offsets = [0]
+    for word in words:
+        word = word.strip().upper()
+        if not (word.isascii() and word.isalpha()):
+            raise ValueError(f'{word!r} must only contain the letters A-Z.')
+        packed.append(word.encode('ascii'))
+        offsets.append(offsets[-1] + len(word))
+    return b''.join([_HEADER.pack(MAGIC, len(packed)),
+        struct.pack(f'<{len(offsets)}I', *offsets)] + packed)
+
+
+def write_word_store(path, words):
+    """Write words to a word store file.
+    """
+    with open(path, 'wb') as file:
+        file.write(pack_words(words))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit('usage: python wordstore.py WORDS_TXT OUTPUT')
+    with open(sys.argv[1]) as words_file:
+        write_word_store(sys.argv[2], [line for line in words_file if
+            line.strip()])